@@ -0,0 +1,78 @@
+"""
+Runs engine searches and other expensive analysis in a separate process, so the pygame loop keeps rendering
+while they run. Nothing in here imports pygame. Positions are sent to the worker packed with Position.pack, like
+ParallelSearch does, instead of pickling their board array, history and undo stack.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from Book import Book
+from Engine import Engine
+from MoveCache import analyse
+from Position import Position
+
+_engine = None
+_generation = None
+
+
+def _init_worker(generation, book_path):
+    global _engine, _generation
+    # every process maps the book itself, a mapping can't be pickled
+    _engine = Engine(book=Book(book_path) if book_path is not None else None)
+    _generation = generation
+
+
+def _search(packed, time_budget, generation):
+    _engine.stop_check = lambda: _generation.value != generation
+    return _engine.search(Position.unpack(packed), time_budget=time_budget)
+
+
+def _analyse(packed):
+    return analyse(Position.unpack(packed))
+
+
+class BackgroundWorker:
+    """
+    One worker process for engine searches and legal move precomputation.
+
+    Every call returns a concurrent.futures.Future right away, the caller polls done() and reads result().
+    cancel() stops a running search, which then returns its best move so far.
+    """
+
+    def __init__(self, book_path=None):
+        """
+        :param book_path: str, opening book the engine plays from, None for no book
+        """
+        # spawn, so the worker doesn't inherit the SDL state of the window process
+        context = multiprocessing.get_context("spawn")
+        self.generation = context.Value("i", 0)
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                            initargs=(self.generation, book_path))
+
+    def search(self, position, time_budget):
+        """
+        Searches the best move of the side to move.
+        :param position: Position
+        :param time_budget: float, seconds
+        :return: Future of move, score, depth like Engine.search
+        """
+        return self.executor.submit(_search, position.pack(), time_budget, self.generation.value)
+
+    def analyse(self, position):
+        """
+        Generates the legal moves of the side to move and whether it is in check.
+        :param position: Position
+        :return: Future of dict(tile, list) and bool, like MoveCache.analyse
+        """
+        return self.executor.submit(_analyse, position.pack())
+
+    def cancel(self):
+        """
+        Stops the searches submitted so far.
+        """
+        with self.generation.get_lock():
+            self.generation.value += 1
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,377 @@
+"""
+Attack maps, check flags, legal move counts and evaluations for many positions at once with NumPy.
+
+Positions are an N x 8 x 8 int8 array indexed [n, y, x] like Position.board: 0 for an empty tile, 1 to 6 for
+the white pawn, knight, bishop, rook, queen and king and -1 to -6 for the black ones. They are packed into one
+uint64 bitboard per piece type and position, bit y * 8 + x like in Bitboard, and every computation is a fixed
+number of shifts and masks over those N-element arrays, so the Python work doesn't grow with N.
+
+Internally the side to move is always made the positive one moving towards y = 0: positions with black to move
+are mirrored vertically and their signs flipped first.
+"""
+import numpy as np
+
+import Evaluation
+from Bitboard import BitboardPosition, PIECE_TYPES, WHITE, BLACK, WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG
+from Piece import Piece
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+KNIGHT_OFFSETS = ((1, -2), (-1, -2), (1, 2), (-1, 2), (2, -1), (2, 1), (-2, -1), (-2, 1))
+KING_OFFSETS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+# (dx, dy) and whether a rook (True) or a bishop (False) moves that way
+DIRECTIONS = (((0, -1), True), ((0, 1), True), ((1, 0), True), ((-1, 0), True),
+              ((-1, -1), False), ((1, 1), False), ((1, -1), False), ((-1, 1), False))
+FULL = np.uint64((1 << 64) - 1)
+ZERO = np.uint64(0)
+# the files a shift by dx may move tiles onto without wrapping around the board
+NOT_FILES = {dx: np.uint64(~sum(0x0101010101010101 << (x if dx > 0 else 7 - x) for x in range(abs(dx)))
+                           & ((1 << 64) - 1)) for dx in (-2, -1, 1, 2)}
+ROWS = [np.uint64(0xFF << (8 * row)) for row in range(8)]
+
+
+def encode_positions(positions):
+    """
+    Builds the arrays the batch functions take out of Position objects.
+    :param positions: list of Position
+    :return: boards: N x 8 x 8 int8 array, whites_turn: N bool array, castling: N x 4 bool array in KQkq order,
+        ep_squares: N int array, y * 8 + x of the en passant tile or -1
+    """
+    count = len(positions)
+    boards = np.zeros((count, 8, 8), dtype=np.int8)
+    whites_turn = np.zeros(count, dtype=bool)
+    castling = np.zeros((count, 4), dtype=bool)
+    ep_squares = np.full(count, -1, dtype=np.int16)
+    codes = {"-": 0}
+    for n, position in enumerate(positions):
+        row = boards[n].reshape(64)
+        for square, piece in enumerate(position.board.flat):
+            if piece != "-":
+                code = codes.get(piece)
+                if code is None:
+                    code = codes[piece] = (PIECE_TYPES.index(piece.typ) + 1) * (1 if piece.white else -1)
+                row[square] = code
+        whites_turn[n] = position.whites_turn
+        castling[n] = [right in position.castling for right in "KQkq"]
+        if position.ep_tile is not None:
+            ep_squares[n] = position.ep_tile[1] * 8 + position.ep_tile[0]
+    return boards, whites_turn, castling, ep_squares
+
+
+def attack_maps(boards, by_white):
+    """
+    Returns which tiles the pieces of one color attack in every position.
+    :param boards: N x 8 x 8 int array
+    :param by_white: bool, or an N bool array to choose the color per position
+    :return: N x 8 x 8 bool array
+    """
+    by_white = np.broadcast_to(np.asarray(by_white, dtype=bool), (len(boards),))
+    view, mirrored = _side_to_move_view(boards, by_white)
+    sets = _PieceSets(view)
+    attacks = _unpack(_attacks(sets.pieces, 1, sets.empty))
+    attacks[mirrored] = attacks[mirrored][:, ::-1, :]
+    return attacks
+
+
+def in_check(boards, whites_turn):
+    """
+    Returns whether the side to move is in check in every position.
+    :param boards: N x 8 x 8 int array
+    :param whites_turn: N bool array
+    :return: N bool array
+    """
+    view, _ = _side_to_move_view(boards, whites_turn)
+    sets = _PieceSets(view)
+    return _attacks(sets.pieces, -1, sets.empty) & sets.pieces[KING] != 0
+
+
+def move_counts(boards, whites_turn, castling=None, ep_squares=None):
+    """
+    Counts the legal moves of the side to move in every position, every promotion piece being a move of its own
+    like in perft. Positions with an en passant tile are counted with BitboardPosition, en passant legality
+    depends on pieces on the same rank in ways that don't vectorize well and only few positions have one.
+    :param boards: N x 8 x 8 int array, every position needs both kings
+    :param whites_turn: N bool array
+    :param castling: N x 4 bool array in KQkq order, no castling if omitted
+    :param ep_squares: N int array, -1 where there is no en passant tile
+    :return: N int array
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    whites_turn = np.asarray(whites_turn, dtype=bool)
+    view, _ = _side_to_move_view(boards, whites_turn)
+    sets = _PieceSets(view)
+    pieces = sets.pieces
+    king = pieces[KING]
+    not_own = ~sets.own
+
+    # the king may not step onto an attacked tile, also not one behind it on the line of a checking slider
+    attacked = _attacks(pieces, -1, sets.empty | king)
+    counts = _popcount(_king_attacks(king) & not_own & ~attacked)
+
+    checkers, check_mask, pin_sources, pin_rays = _checks_and_pins(sets)
+    checked = checkers > 0
+    target_mask = np.where(checked, check_mask, FULL)
+    pinned = ZERO
+    for sources in pin_sources:
+        pinned = pinned | sources
+    counts += np.where(checkers < 2, _count_moves(sets, sets.own & ~king & ~pinned, target_mask), 0)
+    for sources, ray in zip(pin_sources, pin_rays):
+        # a pinned piece can't block a check or take the checker, it stays on the line through its own king
+        if sources.any():
+            counts += np.where(checked, 0, _count_moves(sets, sources, ray))
+
+    if castling is not None:
+        castling = np.asarray(castling, dtype=bool)
+        # the rights of the side to move come first after mirroring
+        ours = np.where(whites_turn[:, None], castling[:, :2], castling[:, 2:])
+        counts += _count_castles(sets, attacked, checked, ours)
+
+    if ep_squares is not None:
+        for n in np.flatnonzero(np.asarray(ep_squares) >= 0):
+            position = _bitboard_position(boards[n], whites_turn[n], castling, ep_squares[n], n)
+            counts[n] = len(position.legal_moves())
+    return counts
+
+
+class _PieceSets:
+    """
+    One uint64 array per piece code of a side to move view, plus the own, enemy and empty tiles.
+    """
+
+    def __init__(self, view):
+        count = len(view)
+        flat = view.reshape(count, 64)
+        self.pieces = {}
+        for code in range(-6, 7):
+            if code != 0:
+                packed = np.packbits(flat == code, axis=1, bitorder="little")
+                self.pieces[code] = np.ascontiguousarray(packed).view("<u8").reshape(count)
+        self.own = ZERO
+        self.enemy = ZERO
+        for code in range(1, 7):
+            self.own = self.own | self.pieces[code]
+            self.enemy = self.enemy | self.pieces[-code]
+        self.empty = ~(self.own | self.enemy)
+
+
+def _code_arrays():
+    mg = np.zeros((13, 64), dtype=np.int32)
+    eg = np.zeros((13, 64), dtype=np.int32)
+    phase = np.zeros(13, dtype=np.int32)
+    for index, typ in enumerate(Evaluation.PIECE_TYPES):
+        for color, code in (("w", index + 1), ("b", -index - 1)):
+            mg[code + 6] = [score for score, _ in Evaluation.SCORES[Piece(color, typ).index]]
+            eg[code + 6] = [score for _, score in Evaluation.SCORES[Piece(color, typ).index]]
+            phase[code + 6] = Evaluation.PHASE_WEIGHTS[typ]
+    return mg, eg, phase
+
+
+# the scores of Evaluation for the piece codes in rows code + 6, so -6 to 6 map to 0 to 12
+_MG_ARRAY, _EG_ARRAY, _PHASE_ARRAY = _code_arrays()
+
+
+def evaluate_batch(boards, whites_turn=None):
+    """
+    Scores many positions at once with the same result as Evaluation.evaluate.
+    :param boards: N x 8 x 8 int array, piece codes like from encode_positions
+    :param whites_turn: N bool array, the scores are from white's view if omitted
+    :return: N int array
+    """
+    codes = np.asarray(boards).reshape(len(boards), 64).astype(np.intp) + 6
+    squares = np.arange(64)
+    mg = _MG_ARRAY[codes, squares].sum(axis=1, dtype=np.int64)
+    eg = _EG_ARRAY[codes, squares].sum(axis=1, dtype=np.int64)
+    phase = np.minimum(_PHASE_ARRAY[codes].sum(axis=1, dtype=np.int64), Evaluation.MAX_PHASE)
+    scores = (mg * phase + eg * (Evaluation.MAX_PHASE - phase)) // Evaluation.MAX_PHASE
+    if whites_turn is not None:
+        scores = np.where(whites_turn, scores, -scores)
+    return scores
+
+
+def _side_to_move_view(boards, whites_turn):
+    boards = np.asarray(boards, dtype=np.int8)
+    mirrored = ~np.asarray(whites_turn, dtype=bool)
+    view = boards.copy()
+    view[mirrored] = -boards[mirrored][:, ::-1, :]
+    return view, mirrored
+
+
+def _shift(bitboards, dx, dy):
+    """
+    Moves every set tile by (dx, dy), tiles moved off the board are dropped.
+    """
+    offset = dy * 8 + dx
+    if offset > 0:
+        bitboards = bitboards << np.uint64(offset)
+    else:
+        bitboards = bitboards >> np.uint64(-offset)
+    if dx != 0:
+        bitboards = bitboards & NOT_FILES[dx]
+    return bitboards
+
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(bitboards):
+        return np.bitwise_count(bitboards).astype(np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+    def _popcount(bitboards):
+        return _BYTE_COUNTS[bitboards.astype("<u8").view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _unpack(bitboards):
+    bits = np.unpackbits(bitboards.astype("<u8").view(np.uint8), bitorder="little")
+    return bits.reshape(len(bitboards), 8, 8).astype(bool)
+
+
+def _king_attacks(kings):
+    attacks = ZERO
+    for dx, dy in KING_OFFSETS:
+        attacks = attacks | _shift(kings, dx, dy)
+    return attacks
+
+
+def _knight_attacks(knights):
+    attacks = ZERO
+    for dx, dy in KNIGHT_OFFSETS:
+        attacks = attacks | _shift(knights, dx, dy)
+    return attacks
+
+
+def _attacks(pieces, sign, empty):
+    """
+    Tiles attacked by the pieces of one side, the side to move (sign 1) capturing with its pawns towards y = 0.
+    :param empty: tiles sliding pieces pass through
+    """
+    pawns = pieces[sign * PAWN]
+    attacks = _shift(pawns, -1, -sign) | _shift(pawns, 1, -sign)
+    attacks = attacks | _knight_attacks(pieces[sign * KNIGHT]) | _king_attacks(pieces[sign * KING])
+    queens = pieces[sign * QUEEN]
+    rooks = pieces[sign * ROOK] | queens
+    bishops = pieces[sign * BISHOP] | queens
+    for (dx, dy), straight in DIRECTIONS:
+        frontier = _shift(rooks if straight else bishops, dx, dy)
+        while frontier.any():
+            attacks = attacks | frontier
+            frontier = _shift(frontier & empty, dx, dy)
+    return attacks
+
+
+def _checks_and_pins(sets):
+    """
+    Walks out from the king in every direction.
+    :return: number of checkers: N int array, check_mask: tiles that take a single checker or block it,
+        pin_sources: per direction the pinned piece, pin_rays: per direction the tiles it may move to
+    """
+    pieces = sets.pieces
+    king = pieces[KING]
+    pawn_checkers = (_shift(king, -1, -1) | _shift(king, 1, -1)) & pieces[-PAWN]
+    knight_checkers = _knight_attacks(king) & pieces[-KNIGHT]
+    check_mask = pawn_checkers | knight_checkers
+    checkers = _popcount(check_mask)
+
+    pin_sources = []
+    pin_rays = []
+    for (dx, dy), straight in DIRECTIONS:
+        sliders = pieces[-ROOK if straight else -BISHOP] | pieces[-QUEEN]
+        tile = king
+        # tiles passed before and after the first own piece, and the first own piece itself
+        before = ZERO
+        after = ZERO
+        candidate = ZERO
+        pinned = ZERO
+        pin_ray = ZERO
+        found_own = np.zeros(len(king), dtype=bool)
+        done = np.zeros(len(king), dtype=bool)
+        for _ in range(7):
+            tile = _shift(tile, dx, dy)
+            on_board = tile != 0
+            if not on_board.any():
+                break
+            is_empty = tile & sets.empty != 0
+            is_slider = tile & sliders != 0
+            active = ~done & on_board
+            searching = active & ~found_own
+
+            # the first piece on the line is a checking slider
+            check = searching & is_slider
+            checkers += check
+            check_mask = check_mask | np.where(check, before | tile, ZERO)
+            # an own piece between the king and a slider is pinned
+            pin = active & found_own & is_slider
+            pinned = pinned | np.where(pin, candidate, ZERO)
+            pin_ray = pin_ray | np.where(pin, before | after | tile, ZERO)
+
+            first_own = searching & (tile & sets.own != 0)
+            candidate = candidate | np.where(first_own, tile, ZERO)
+            before = before | np.where(searching & is_empty, tile, ZERO)
+            after = after | np.where(active & found_own & is_empty, tile, ZERO)
+            done |= active & ~is_empty & ~first_own
+            found_own |= first_own
+        pin_sources.append(pinned)
+        pin_rays.append(pin_ray)
+    return checkers, check_mask, pin_sources, pin_rays
+
+
+def _count_moves(sets, sources, targets):
+    """
+    Counts the moves of the non king pieces on the source tiles that end on a target tile, promotions four times.
+    """
+    pieces = sets.pieces
+    empty = sets.empty
+    allowed = ~sets.own & targets
+
+    pawns = sources & pieces[PAWN]
+    single = _shift(pawns, 0, -1) & empty
+    double = _shift(single & ROWS[5], 0, -1) & empty & targets
+    single = single & targets
+    counts = _popcount(single) + _popcount(double) + 3 * _popcount(single & ROWS[0])
+    # one direction at a time, two pawns may take on the same tile
+    for dx in (-1, 1):
+        captures = _shift(pawns, dx, -1) & sets.enemy & targets
+        counts += _popcount(captures) + 3 * _popcount(captures & ROWS[0])
+
+    knights = sources & pieces[KNIGHT]
+    for dx, dy in KNIGHT_OFFSETS:
+        counts += _popcount(_shift(knights, dx, dy) & allowed)
+
+    queens = sources & pieces[QUEEN]
+    rooks = sources & pieces[ROOK] | queens
+    bishops = sources & pieces[BISHOP] | queens
+    for (dx, dy), straight in DIRECTIONS:
+        # rays of pieces going the same way can't overlap, the piece behind is blocked by the one in front
+        frontier = _shift(rooks if straight else bishops, dx, dy)
+        while frontier.any():
+            counts += _popcount(frontier & allowed)
+            frontier = _shift(frontier & empty, dx, dy)
+    return counts
+
+
+def _count_castles(sets, attacked, checked, rights):
+    pieces = sets.pieces
+    empty = sets.empty
+    safe = ~attacked
+    home = (pieces[KING] & np.uint64(1 << 60) != 0) & ~checked
+    rooks = pieces[ROOK]
+    short_empty = np.uint64(1 << 61 | 1 << 62)
+    long_empty = np.uint64(1 << 57 | 1 << 58 | 1 << 59)
+    long_safe = np.uint64(1 << 58 | 1 << 59)
+    short = (home & rights[:, 0] & (rooks & np.uint64(1 << 63) != 0) & (empty & short_empty == short_empty)
+             & (safe & short_empty == short_empty))
+    long = (home & rights[:, 1] & (rooks & np.uint64(1 << 56) != 0) & (empty & long_empty == long_empty)
+            & (safe & long_safe == long_safe))
+    return short.astype(np.int64) + long.astype(np.int64)
+
+
+def _bitboard_position(board, white, castling, ep_square, n):
+    position = BitboardPosition.empty()
+    for square, code in enumerate(board.reshape(64)):
+        if code != 0:
+            position.put_piece(WHITE if code > 0 else BLACK, abs(int(code)) - 1, square)
+    position.whites_turn = bool(white)
+    if castling is not None:
+        for right, allowed in zip((WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG), castling[n]):
+            if allowed:
+                position.castling |= right
+    position.ep_square = int(ep_square)
+    return position
@@ -0,0 +1,489 @@
+import Evaluation
+import Move
+import Zobrist
+from Piece import Piece
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_TYPES = "PNBRQK"
+FULL = (1 << 64) - 1
+
+WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG = 1, 2, 4, 8
+
+ROOK_DIRECTIONS = ((0, -1), (0, 1), (1, 0), (-1, 0))
+BISHOP_DIRECTIONS = ((-1, -1), (1, 1), (1, -1), (-1, 1))
+
+
+def _step_attacks(offsets):
+    table = []
+    for square in range(64):
+        x, y = square & 7, square >> 3
+        attacks = 0
+        for dx, dy in offsets:
+            if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+                attacks |= 1 << ((y + dy) * 8 + x + dx)
+        table.append(attacks)
+    return table
+
+
+def _ray(square, dx, dy):
+    squares = []
+    x, y = (square & 7) + dx, (square >> 3) + dy
+    while 0 <= x < 8 and 0 <= y < 8:
+        squares.append(y * 8 + x)
+        x += dx
+        y += dy
+    return squares
+
+
+def _slide(square, occupied, directions):
+    attacks = 0
+    for dx, dy in directions:
+        for target in _ray(square, dx, dy):
+            attacks |= 1 << target
+            if occupied >> target & 1:
+                break
+    return attacks
+
+
+def _relevant_mask(square, directions):
+    # the last square of a ray is attacked whether or not it is occupied, so it doesn't belong in the key
+    mask = 0
+    for dx, dy in directions:
+        for target in _ray(square, dx, dy)[:-1]:
+            mask |= 1 << target
+    return mask
+
+
+KNIGHT_ATTACKS = _step_attacks(((1, -2), (-1, -2), (1, 2), (-1, 2), (2, -1), (2, 1), (-2, -1), (-2, 1)))
+KING_ATTACKS = _step_attacks(((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)))
+# white pawns move towards y = 0, black pawns towards y = 7
+PAWN_ATTACKS = (_step_attacks(((-1, -1), (1, -1))), _step_attacks(((-1, 1), (1, 1))))
+
+ROOK_MASKS = [_relevant_mask(square, ROOK_DIRECTIONS) for square in range(64)]
+BISHOP_MASKS = [_relevant_mask(square, BISHOP_DIRECTIONS) for square in range(64)]
+ROOK_RAYS = [_slide(square, 0, ROOK_DIRECTIONS) for square in range(64)]
+BISHOP_RAYS = [_slide(square, 0, BISHOP_DIRECTIONS) for square in range(64)]
+
+# per square lookup from the relevant occupancy to the attack set. The dictionary is the perfect hash a magic
+# multiplication would give in C, and it is filled on first use so importing the module stays cheap.
+_ROOK_TABLES = [{} for _ in range(64)]
+_BISHOP_TABLES = [{} for _ in range(64)]
+
+
+def _between_table():
+    table = [[0] * 64 for _ in range(64)]
+    for square in range(64):
+        for dx, dy in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            between = 0
+            for target in _ray(square, dx, dy):
+                table[square][target] = between
+                between |= 1 << target
+    return table
+
+
+# squares strictly between two squares on a common line, 0 if they don't share one
+BETWEEN = _between_table()
+
+# castling rights that survive a move touching the square
+CASTLING_KEEP = [15] * 64
+CASTLING_KEEP[60] = 15 & ~(WHITE_SHORT | WHITE_LONG)
+CASTLING_KEEP[63] = 15 & ~WHITE_SHORT
+CASTLING_KEEP[56] = 15 & ~WHITE_LONG
+CASTLING_KEEP[4] = 15 & ~(BLACK_SHORT | BLACK_LONG)
+CASTLING_KEEP[7] = 15 & ~BLACK_SHORT
+CASTLING_KEEP[0] = 15 & ~BLACK_LONG
+
+# right, king from, king to, rook from, rook to, squares that must be empty, squares the king passes, flag
+CASTLES = (
+    ((WHITE_SHORT, 60, 62, 63, 61, 1 << 61 | 1 << 62, (61, 62), Move.SHORT_CASTLE),
+     (WHITE_LONG, 60, 58, 56, 59, 1 << 57 | 1 << 58 | 1 << 59, (59, 58), Move.LONG_CASTLE)),
+    ((BLACK_SHORT, 4, 6, 7, 5, 1 << 5 | 1 << 6, (5, 6), Move.SHORT_CASTLE),
+     (BLACK_LONG, 4, 2, 0, 3, 1 << 1 | 1 << 2 | 1 << 3, (3, 2), Move.LONG_CASTLE)),
+)
+
+START_RANK = ("R", "N", "B", "Q", "K", "B", "N", "R")
+# Zobrist key of every set of castling rights
+CASTLING_ZOBRIST = [0] * 16
+for _rights in range(16):
+    for _right, _letter in zip((WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG), "KQkq"):
+        if _rights & _right:
+            CASTLING_ZOBRIST[_rights] ^= Zobrist.CASTLING_KEYS[_letter]
+# game phase weight of pieces[color * 6 + type]
+PHASES = [Evaluation.PHASE_WEIGHTS[typ] for typ in PIECE_TYPES] * 2
+
+
+def rook_attacks(square, occupied):
+    key = occupied & ROOK_MASKS[square]
+    table = _ROOK_TABLES[square]
+    attacks = table.get(key)
+    if attacks is None:
+        attacks = table[key] = _slide(square, key, ROOK_DIRECTIONS)
+    return attacks
+
+
+def bishop_attacks(square, occupied):
+    key = occupied & BISHOP_MASKS[square]
+    table = _BISHOP_TABLES[square]
+    attacks = table.get(key)
+    if attacks is None:
+        attacks = table[key] = _slide(square, key, BISHOP_DIRECTIONS)
+    return attacks
+
+
+def queen_attacks(square, occupied):
+    return rook_attacks(square, occupied) | bishop_attacks(square, occupied)
+
+
+def squares_of(bitboard):
+    """
+    Yields the indices of the set bits of a bitboard.
+    :param bitboard: int
+    """
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+class BitboardPosition:
+    """
+    Chess position stored as one 64 bit integer per piece type and color.
+
+    Square y * 8 + x is bit y * 8 + x, the same tiles Position uses. Moves are 16 bit ints from the Move module
+    and make_move returns a new position, so a position can be shared freely once it is built. Like Position it
+    keeps its Zobrist key (without the side to move) and the sums of Evaluation up to date with every move, so
+    Engine can search it.
+    """
+    __slots__ = ("pieces", "occupancy", "whites_turn", "castling", "ep_square", "key", "mg", "eg", "phase")
+
+    def __init__(self):
+        # pieces[color * 6 + type]
+        self.pieces = [0] * 12
+        self.occupancy = [0, 0]
+        self.whites_turn = True
+        self.castling = WHITE_SHORT | WHITE_LONG | BLACK_SHORT | BLACK_LONG
+        self.ep_square = -1
+        self.key = CASTLING_ZOBRIST[self.castling]
+        self.mg = self.eg = self.phase = 0
+        for x, typ in enumerate(START_RANK):
+            self.put_piece(BLACK, PIECE_TYPES.index(typ), x)
+            self.put_piece(BLACK, PAWN, 8 + x)
+            self.put_piece(WHITE, PAWN, 48 + x)
+            self.put_piece(WHITE, PIECE_TYPES.index(typ), 56 + x)
+
+    @classmethod
+    def empty(cls):
+        position = cls.__new__(cls)
+        position.pieces = [0] * 12
+        position.occupancy = [0, 0]
+        position.whites_turn = True
+        position.castling = 0
+        position.ep_square = -1
+        position.key = position.mg = position.eg = position.phase = 0
+        return position
+
+    @classmethod
+    def from_position(cls, position):
+        """
+        Builds the bitboards for a Position.
+        :param position: Position
+        :return: BitboardPosition
+        """
+        bitboards = cls.empty()
+        for y in range(8):
+            for x in range(8):
+                piece = position.board[y, x]
+                if isinstance(piece, Piece):
+                    bitboards.put_piece(WHITE if piece.white else BLACK, PIECE_TYPES.index(piece.typ), y * 8 + x)
+        bitboards.whites_turn = position.whites_turn
+        for right, letter in zip((WHITE_SHORT, WHITE_LONG, BLACK_SHORT, BLACK_LONG), "KQkq"):
+            if letter in position.castling:
+                bitboards.castling |= right
+        bitboards.key ^= CASTLING_ZOBRIST[bitboards.castling]
+        if position.ep_tile is not None:
+            bitboards.ep_square = Move.tile_to_square(position.ep_tile)
+            bitboards.key ^= Zobrist.EP_KEYS[position.ep_tile[0]]
+        return bitboards
+
+    def put_piece(self, color, piece_type, square):
+        index = color * 6 + piece_type
+        self.pieces[index] |= 1 << square
+        self.occupancy[color] |= 1 << square
+        self.key ^= Zobrist.PIECE_KEYS[index][square]
+        mg, eg = Evaluation.SCORES[index][square]
+        self.mg += mg
+        self.eg += eg
+        self.phase += PHASES[index]
+
+    def piece_at(self, square):
+        """
+        Returns color and type of the piece on a square.
+        :param square: int
+        :return: tuple or None
+        """
+        for index in range(12):
+            if self.pieces[index] >> square & 1:
+                return index // 6, index % 6
+        return None
+
+    def copy(self):
+        position = BitboardPosition.__new__(BitboardPosition)
+        position.pieces = self.pieces[:]
+        position.occupancy = self.occupancy[:]
+        position.whites_turn = self.whites_turn
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.key = self.key
+        position.mg, position.eg, position.phase = self.mg, self.eg, self.phase
+        return position
+
+    def zobrist_key(self):
+        """
+        Returns the 64 bit Zobrist key of the position including the side to move, the same as Position's.
+        :return: int
+        """
+        return self.key if self.whites_turn else self.key ^ Zobrist.SIDE_KEY
+
+    def attackers_to(self, square, color, occupied):
+        """
+        Returns the pieces of a color that attack a square.
+        :param square: int
+        :param color: int
+        :param occupied: int, occupancy used to block sliding pieces
+        :return: int
+        """
+        pieces = self.pieces
+        base = color * 6
+        queens = pieces[base + QUEEN]
+        return ((PAWN_ATTACKS[color ^ 1][square] & pieces[base + PAWN])
+                | (KNIGHT_ATTACKS[square] & pieces[base + KNIGHT])
+                | (KING_ATTACKS[square] & pieces[base + KING])
+                | (rook_attacks(square, occupied) & (pieces[base + ROOK] | queens))
+                | (bishop_attacks(square, occupied) & (pieces[base + BISHOP] | queens)))
+
+    def in_check(self):
+        us = WHITE if self.whites_turn else BLACK
+        king_square = self.pieces[us * 6 + KING].bit_length() - 1
+        return self.attackers_to(king_square, us ^ 1, self.occupancy[0] | self.occupancy[1]) != 0
+
+    def legal_moves(self, captures_only=False):
+        """
+        Returns all legal moves of the side to move.
+        :param captures_only: bool, only captures and en passant, for the quiescence search
+        :return: list(int)
+        """
+        us = WHITE if self.whites_turn else BLACK
+        them = us ^ 1
+        pieces = self.pieces
+        base = us * 6
+        enemy_base = them * 6
+        own = self.occupancy[us]
+        enemy = self.occupancy[them]
+        occupied = own | enemy
+        # squares a piece may move to, before checks and pins
+        reachable = enemy if captures_only else ~own
+        encode = Move.encode
+        moves = []
+
+        king = pieces[base + KING]
+        king_square = king.bit_length() - 1
+        checkers = self.attackers_to(king_square, them, occupied)
+
+        # the king may not step onto an attacked square, also not along the line of a slider checking it
+        without_king = occupied ^ king
+        for target in squares_of(KING_ATTACKS[king_square] & reachable):
+            if not self.attackers_to(target, them, without_king):
+                moves.append(encode(king_square, target, Move.CAPTURE if enemy >> target & 1 else Move.QUIET))
+        if checkers & (checkers - 1):
+            return moves
+
+        if checkers:
+            check_mask = BETWEEN[king_square][checkers.bit_length() - 1] | checkers
+        else:
+            check_mask = FULL
+
+        pinned = 0
+        pin_rays = {}
+        enemy_queens = pieces[enemy_base + QUEEN]
+        snipers = ((ROOK_RAYS[king_square] & (pieces[enemy_base + ROOK] | enemy_queens))
+                   | (BISHOP_RAYS[king_square] & (pieces[enemy_base + BISHOP] | enemy_queens)))
+        for sniper in squares_of(snipers):
+            between = BETWEEN[king_square][sniper]
+            blockers = between & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+                pin_rays[blockers.bit_length() - 1] = between | 1 << sniper
+
+        for square in squares_of(pieces[base + KNIGHT] & ~pinned):
+            self._add_moves(moves, square, KNIGHT_ATTACKS[square] & reachable & check_mask, enemy)
+        for piece_type, attacks in ((BISHOP, bishop_attacks), (ROOK, rook_attacks), (QUEEN, queen_attacks)):
+            for square in squares_of(pieces[base + piece_type]):
+                targets = attacks(square, occupied) & reachable & check_mask
+                if pinned >> square & 1:
+                    targets &= pin_rays[square]
+                self._add_moves(moves, square, targets, enemy)
+
+        self._add_pawn_moves(moves, us, occupied, enemy, check_mask, pinned, pin_rays, king_square, captures_only)
+
+        if not checkers and not captures_only:
+            for right, king_from, king_to, rook_from, _, empty, passed, flag in CASTLES[us]:
+                if (self.castling & right and not occupied & empty and pieces[base + ROOK] >> rook_from & 1
+                        and not self.attackers_to(passed[0], them, occupied)
+                        and not self.attackers_to(passed[1], them, occupied)):
+                    moves.append(encode(king_from, king_to, flag))
+        return moves
+
+    @staticmethod
+    def _add_moves(moves, from_square, targets, enemy):
+        while targets:
+            lowest = targets & -targets
+            target = lowest.bit_length() - 1
+            moves.append(from_square | target << 6 | (Move.CAPTURE << 12 if enemy & lowest else 0))
+            targets ^= lowest
+
+    def _add_pawn_moves(self, moves, us, occupied, enemy, check_mask, pinned, pin_rays, king_square, captures_only):
+        encode = Move.encode
+        forward = -8 if us == WHITE else 8
+        start_row = 6 if us == WHITE else 1
+        last_row = 0 if us == WHITE else 7
+        attacks = PAWN_ATTACKS[us]
+        for square in squares_of(self.pieces[us * 6 + PAWN]):
+            allowed = check_mask
+            if pinned >> square & 1:
+                allowed &= pin_rays[square]
+            targets = 0
+            push = square + forward
+            if not captures_only and not occupied >> push & 1:
+                targets |= 1 << push
+                if square >> 3 == start_row and not occupied >> (push + forward) & 1 and allowed >> (
+                        push + forward) & 1:
+                    moves.append(encode(square, push + forward, Move.DOUBLE_PAWN_PUSH))
+            targets = (targets | attacks[square] & enemy) & allowed
+            for target in squares_of(targets):
+                flag = Move.CAPTURE if enemy >> target & 1 else Move.QUIET
+                if target >> 3 == last_row:
+                    for promotion in range(4):
+                        moves.append(encode(square, target, flag | Move.PROMOTION | promotion))
+                else:
+                    moves.append(encode(square, target, flag))
+            if self.ep_square >= 0 and attacks[square] >> self.ep_square & 1:
+                if self._en_passant_is_legal(us, square, self.ep_square, occupied, king_square):
+                    moves.append(encode(square, self.ep_square, Move.EN_PASSANT))
+
+    def _en_passant_is_legal(self, us, from_square, to_square, occupied, king_square):
+        # en passant removes two pieces from a line at once, so it is checked against the resulting occupancy
+        captured = to_square + (8 if us == WHITE else -8)
+        occupied = occupied ^ (1 << from_square) ^ (1 << captured) | (1 << to_square)
+        pieces = self.pieces
+        enemy_base = (us ^ 1) * 6
+        queens = pieces[enemy_base + QUEEN]
+        return not ((rook_attacks(king_square, occupied) & (pieces[enemy_base + ROOK] | queens))
+                    | (bishop_attacks(king_square, occupied) & (pieces[enemy_base + BISHOP] | queens))
+                    | (KNIGHT_ATTACKS[king_square] & pieces[enemy_base + KNIGHT])
+                    | (PAWN_ATTACKS[us][king_square] & pieces[enemy_base + PAWN] & ~(1 << captured)))
+
+    def make_move(self, move):
+        """
+        Returns the position after a legal move.
+        :param move: int
+        :return: BitboardPosition
+        """
+        position = self.copy()
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        flags = move >> 12
+        us = WHITE if self.whites_turn else BLACK
+        them = us ^ 1
+        pieces = position.pieces
+        occupancy = position.occupancy
+        base = us * 6
+        from_bit = 1 << from_square
+        to_bit = 1 << to_square
+        piece_keys = Zobrist.PIECE_KEYS
+        scores = Evaluation.SCORES
+        key = self.key
+        mg, eg, phase = self.mg, self.eg, self.phase
+        if self.ep_square >= 0:
+            key ^= Zobrist.EP_KEYS[self.ep_square & 7]
+
+        if flags & Move.CAPTURE:
+            if flags == Move.EN_PASSANT:
+                captured_square = to_square + (8 if us == WHITE else -8)
+                captured = them * 6 + PAWN
+            else:
+                captured_square = to_square
+                for captured in range(them * 6, them * 6 + 6):
+                    if pieces[captured] & to_bit:
+                        break
+            captured_bit = 1 << captured_square
+            pieces[captured] ^= captured_bit
+            occupancy[them] ^= captured_bit
+            key ^= piece_keys[captured][captured_square]
+            captured_mg, captured_eg = scores[captured][captured_square]
+            mg -= captured_mg
+            eg -= captured_eg
+            phase -= PHASES[captured]
+
+        for index in range(base, base + 6):
+            if pieces[index] & from_bit:
+                break
+        pieces[index] ^= from_bit
+        key ^= piece_keys[index][from_square]
+        piece_mg, piece_eg = scores[index][from_square]
+        mg -= piece_mg
+        eg -= piece_eg
+        if flags & Move.PROMOTION:
+            phase -= PHASES[index]
+            index = base + KNIGHT + (flags & 3)
+            phase += PHASES[index]
+        pieces[index] |= to_bit
+        key ^= piece_keys[index][to_square]
+        piece_mg, piece_eg = scores[index][to_square]
+        mg += piece_mg
+        eg += piece_eg
+        occupancy[us] ^= from_bit | to_bit
+
+        if flags == Move.SHORT_CASTLE or flags == Move.LONG_CASTLE:
+            _, _, _, rook_from, rook_to, _, _, _ = CASTLES[us][0 if flags == Move.SHORT_CASTLE else 1]
+            rook = base + ROOK
+            rook_bits = 1 << rook_from | 1 << rook_to
+            pieces[rook] ^= rook_bits
+            occupancy[us] ^= rook_bits
+            key ^= piece_keys[rook][rook_from] ^ piece_keys[rook][rook_to]
+            mg += scores[rook][rook_to][0] - scores[rook][rook_from][0]
+            eg += scores[rook][rook_to][1] - scores[rook][rook_from][1]
+
+        if flags == Move.DOUBLE_PAWN_PUSH:
+            position.ep_square = (from_square + to_square) // 2
+            key ^= Zobrist.EP_KEYS[from_square & 7]
+        else:
+            position.ep_square = -1
+        castling = self.castling & CASTLING_KEEP[from_square] & CASTLING_KEEP[to_square]
+        position.key = key ^ CASTLING_ZOBRIST[self.castling] ^ CASTLING_ZOBRIST[castling]
+        position.castling = castling
+        position.mg, position.eg, position.phase = mg, eg, phase
+        position.whites_turn = not self.whites_turn
+        return position
+
+    def get_all_possible_moves(self, tile):
+        """
+        Returns the legal moves of the piece on a tile in the format of Position.get_all_possible_moves.
+        :param tile: tuple
+        :return: list
+        """
+        square = Move.tile_to_square(tile)
+        moves = []
+        for move in self.legal_moves():
+            if move & 63 != square:
+                continue
+            flags = move >> 12
+            if flags == Move.SHORT_CASTLE:
+                target = "short_castle"
+            elif flags == Move.LONG_CASTLE:
+                target = "long_castle"
+            else:
+                target = Move.square_to_tile(move >> 6 & 63)
+            if target not in moves:
+                moves.append(target)
+        return moves
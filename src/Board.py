@@ -1,8 +1,9 @@
-import os
-
-import numpy as np
 import pygame as p
 from Piece import Piece
+from Position import CHECKMATE, Position
+
+
+PIECE_NAMES = [color + typ for color in "wb" for typ in "PNBRQK"]
 
 
 class Board:
@@ -11,31 +12,12 @@ class Board:
 
     def __init__(self, size, screen):
         self.screen = screen
-        self.checks = []
-        self.square_size = size / self.DIMENSION
-        self.moveLog = []
-        self.current_move = 0
-        self.undo_idx = 0
-        self.is_log = False
-        self.move_log_index = 0
-        self.whites_turn = True
+        self.position = Position()
+        self.square_size = size // self.DIMENSION
+        # the piece images as loaded and the sprites scaled to the current square size
+        self.piece_images = {}
         self.images = {}
-        self.in_check = False
         self.sound_on = True
-        self.board = np.array([
-            [Piece("b", "R"), Piece("b", "N"), Piece("b", "B"), Piece("b", "Q"), Piece("b", "K"), Piece("b", "B"),
-             Piece("b", "N"), Piece("b", "R")],
-            [Piece("b", "P"), Piece("b", "P"), Piece("b", "P"), Piece("b", "P"), Piece("b", "P"), Piece("b", "P"),
-             Piece("b", "P"), Piece("b", "P")],
-            ["-", "-", "-", "-", "-", "-", "-", "-"],
-            ["-", "-", "-", "-", "-", "-", "-", "-"],
-            ["-", "-", "-", "-", "-", "-", "-", "-"],
-            ["-", "-", "-", "-", "-", "-", "-", "-"],
-            [Piece("w", "P"), Piece("w", "P"), Piece("w", "P"), Piece("w", "P"), Piece("w", "P"), Piece("w", "P"),
-             Piece("w", "P"), Piece("w", "P")],
-            [Piece("w", "R"), Piece("w", "N"), Piece("w", "B"), Piece("w", "Q"), Piece("w", "K"), Piece("w", "B"),
-             Piece("w", "N"), Piece("w", "R")]
-        ])
         p.init()
         self.check_sound = p.mixer.Sound("../res/sounds/laser1.wav")
         self.take_sound = p.mixer.Sound("../res/sounds/big-impact-7054.wav")
@@ -45,27 +27,112 @@ class Board:
         self.take_sound.set_volume(0.25)
         self.move_sound.set_volume(0.25)
         self.load_images()
+        self.build_atlas()
+        # the empty checkerboard, rendered once and copied to the screen tile by tile
+        self.background = self.render_background()
+        # the piece drawn on every tile and the tiles with a highlight on them, to only redraw what changed
+        self.drawn = [["-"] * self.DIMENSION for _ in range(self.DIMENSION)]
+        self.overlays = set()
+        # screen areas changed since the last call to present
+        self.dirty = []
         self.draw_board()
         self.draw_pieces()
 
+    @property
+    def board(self):
+        return self.position.board
+
+    @board.setter
+    def board(self, board):
+        self.position.board = board
+
+    @property
+    def whites_turn(self):
+        return self.position.whites_turn
+
+    @whites_turn.setter
+    def whites_turn(self, whites_turn):
+        self.position.whites_turn = whites_turn
+
+    @property
+    def in_check(self):
+        return self.position.in_check
+
+    @in_check.setter
+    def in_check(self, in_check):
+        self.position.in_check = in_check
+
+    @property
+    def checks(self):
+        return self.position.checks
+
+    @checks.setter
+    def checks(self, checks):
+        self.position.checks = checks
+
+    @property
+    def moveLog(self):
+        return self.position.moveLog
+
     def load_images(self):
         """
         Loads the images for the pieces and stores it in dictionairy.
         """
         path = "../res/pieces/"
-        for piece in sorted(os.listdir(path)):
-            self.images[piece.replace(".png", "")] = p.image.load(path + piece)
+        for name in PIECE_NAMES:
+            self.piece_images[name] = p.image.load(path + name + ".png")
 
-    def draw_board(self):
+    def build_atlas(self):
+        """
+        Scales all piece images to the square size once and puts them side by side on one surface in the display
+        format, so drawing a piece doesn't need any conversion or scaling. Board.images maps the piece names to
+        subsurfaces of it.
+        """
+        size = int(self.square_size)
+        atlas = p.Surface((size * len(PIECE_NAMES), size), p.SRCALPHA)
+        for index, name in enumerate(PIECE_NAMES):
+            atlas.blit(p.transform.smoothscale(self.piece_images[name], (size, size)), (index * size, 0))
+        self.atlas = atlas.convert_alpha()
+        self.images = {name: self.atlas.subsurface(p.Rect(index * size, 0, size, size))
+                       for index, name in enumerate(PIECE_NAMES)}
+
+    def resize(self, size):
+        """
+        Fits the board into a window of a new size and redraws it.
+        :param size: int, length of the board side in pixels
         """
-        Draws the basic 8x8 chessboard layout.
+        self.screen = p.display.get_surface()
+        self.square_size = max(size // self.DIMENSION, 1)
+        self.build_atlas()
+        self.background = self.render_background()
+        self.draw_board()
+        self.update_board()
+
+    def render_background(self):
         """
+        Renders the basic 8x8 chessboard layout to a surface of its own.
+        :return: Surface
+        """
+        background = p.Surface((self.square_size * self.DIMENSION, self.square_size * self.DIMENSION))
         colors = [p.Color("White"), p.Color("gray")]
         for row in range(self.DIMENSION):
             for col in range(self.DIMENSION):
                 color = colors[(row + col) % 2]
-                p.draw.rect(self.screen, color,
-                            p.Rect(col * self.square_size, row * self.square_size, self.square_size, self.square_size))
+                p.draw.rect(background, color, self.tile_rect((col, row)))
+        return background
+
+    def tile_rect(self, tile):
+        return p.Rect(tile[0] * self.square_size, tile[1] * self.square_size, self.square_size, self.square_size)
+
+    def draw_board(self):
+        """
+        Draws the empty chessboard over the whole screen.
+        """
+        self.screen.fill(p.Color("black"))
+        self.screen.blit(self.background, (0, 0))
+        self.drawn = [["-"] * self.DIMENSION for _ in range(self.DIMENSION)]
+        self.overlays.clear()
+        self.invalidate()
 
     def draw_pieces(self):
         """
@@ -75,9 +142,37 @@ class Board:
             for col in range(self.DIMENSION):
                 piece = self.board[row, col]
                 if piece != "-" and isinstance(piece, Piece):
-                    self.screen.blit(self.images[piece.get_image_name()],
-                                     p.Rect(col * self.square_size, row * self.square_size, self.square_size,
-                                            self.square_size))
+                    rect = self.tile_rect((col, row))
+                    self.screen.blit(self.images[piece.image_name], rect)
+                    self.drawn[row][col] = piece
+                    self.dirty.append(rect)
+
+    def draw_tile(self, tile):
+        """
+        Redraws a single tile with the piece that is on it now, removing any highlight.
+        :param tile: tuple
+        """
+        rect = self.tile_rect(tile)
+        self.screen.blit(self.background, rect, rect)
+        piece = self.board[tile[1], tile[0]]
+        if piece != "-":
+            self.screen.blit(self.images[piece.image_name], rect)
+        self.drawn[tile[1]][tile[0]] = piece
+        self.dirty.append(rect)
+
+    def invalidate(self):
+        """
+        Marks the whole screen as changed, e.g. after the window was uncovered.
+        """
+        self.dirty.append(self.screen.get_rect())
+
+    def present(self):
+        """
+        Pushes the screen areas that changed since the last call to the display. Does nothing on idle frames.
+        """
+        if len(self.dirty) > 0:
+            p.display.update(self.dirty)
+            self.dirty = []
 
     def get_tile_from_pixel_coords(self, pos: tuple):
         """
@@ -90,98 +185,97 @@ class Board:
 
         return x_tile, y_tile
 
+    def is_on_board(self, tile):
+        return 0 <= tile[0] < self.DIMENSION and 0 <= tile[1] < self.DIMENSION
+
     def clicked_on_tile(self, tile: tuple):
         """
         Highlights the tile the player clicked on when a piece is there.
         :param tile: tuple
         """
-        p.draw.rect(self.screen, p.Color(211, 211, 211),
-                    p.Rect(tile[0] * self.square_size, tile[1] * self.square_size, self.square_size,
-                           self.square_size))
-        self.draw_pieces()
+        rect = self.tile_rect(tile)
+        p.draw.rect(self.screen, p.Color(211, 211, 211), rect)
+        piece = self.board[tile[1], tile[0]]
+        if piece != "-":
+            self.screen.blit(self.images[piece.image_name], rect)
+        self.overlays.add(tile)
+        self.dirty.append(rect)
 
     def update_board(self):
         """
-        Updates the board and the pieces.
+        Updates the board and the pieces. Only the tiles whose piece changed or that carry a highlight are redrawn.
         """
-        self.draw_board()
-        self.draw_pieces()
+        for row in range(self.DIMENSION):
+            drawn = self.drawn[row]
+            for col in range(self.DIMENSION):
+                if self.board[row, col] is not drawn[col] or (col, row) in self.overlays:
+                    self.draw_tile((col, row))
+        self.overlays.clear()
         if self.in_check:
             self.draw_capture_rect(self.checks[0][1], color=p.Color("red"))
 
-    def move_piece(self, tile1, tile2):
+    def move_piece(self, tile1, tile2, promotion="Q"):
         """
         Moves piece from one tile to another.
         :param tile1: tuple
         :param tile2: tuple
+        :param promotion: str, type a pawn reaching the last row turns into
         """
-        if tile2 == "short_castle":
-            self.short_castle(tile1)
-            return
-        if tile2 == "long_castle":
-            self.long_castle(tile1)
-            return
-        if isinstance(self.board[tile2[1], tile2[0]], Piece) and self.sound_on:
+        if tile2 != "short_castle" and tile2 != "long_castle" and isinstance(self.board[tile2[1], tile2[0]],
+                                                                               Piece) and self.sound_on:
             p.mixer.Sound.play(self.take_sound)
         elif self.sound_on:
             p.mixer.Sound.play(self.move_sound)
-        piece = self.board[tile1[1], tile1[0]]
-        self.board[tile2[1], tile2[0]] = piece
-        self.board[tile1[1], tile1[0]] = "-"
-        self.update_board()
-        self.moveLog.append((tile1, tile2))
-        self.current_move += 1
-        self.undo_idx += 1
-        # print(self.current_move)
-        # print(self.moveLog)
-
-    def move_piece_index_back(self, idx):
-        """
-        Makes the move of a piece backwards.
-        :param idx: int
-        """
-        move = self.moveLog[idx]
-        tile1 = move[0]
-        tile2 = move[1]
-        piece = self.board[tile2[1], tile2[0]]
-        self.board[tile1[1], tile1[0]] = piece
-        self.board[tile2[1], tile2[0]] = "-"
-        self.undo_idx -= 1
-        print(self.undo_idx)
-        self.update_board()
-
-    def move_piece_index_forward(self, idx):
-        """
-        Makes the move of a piece forward.
-        :param idx: int
-        """
-        move = self.moveLog[idx - 1]
-        tile1 = move[0]
-        tile2 = move[1]
-        piece = self.board[tile1[1], tile1[0]]
-        self.board[tile2[1], tile2[0]] = piece
-        self.board[tile1[1], tile1[0]] = "-"
-        self.undo_idx += 1
+        self.position.move_piece(tile1, tile2, promotion)
         self.update_board()
 
     def can_move(self):
-        if self.current_move == self.undo_idx:
-            return True
-        return False
+        return self.position.can_move()
 
     def undo_move(self):
         """
         Undos move and displays the move before.
         """
-        if len(self.moveLog) > 0 and self.undo_idx > 0:
-            self.move_piece_index_back(self.undo_idx - 1)
+        if self.position.undo_move():
+            self.update_board()
 
     def move_forward(self):
         """
         Displays next move that was played.
         """
-        if len(self.moveLog) > 0 and self.undo_idx < self.current_move:
-            self.move_piece_index_forward(self.undo_idx + 1)
+        if self.position.move_forward():
+            self.update_board()
+
+    def load_fen(self, fen):
+        """
+        Sets up the position of a FEN string and redraws the board.
+        :param fen: str
+        """
+        self.position = Position.from_fen(fen)
+        self.position.check_for_checks()
+        self.draw_board()
+        self.update_board()
+
+    def fen(self):
+        """
+        Returns the position shown as a FEN string.
+        :return: str
+        """
+        return self.position.to_fen()
+
+    def go_to_ply(self, ply):
+        """
+        Displays the position after a number of plies.
+        :param ply: int
+        """
+        if self.position.go_to_ply(ply):
+            self.update_board()
+
+    def go_to_start(self):
+        self.go_to_ply(0)
+
+    def go_to_end(self):
+        self.go_to_ply(len(self.position.history))
 
     def get_all_possible_moves(self, tile):
         """
@@ -189,63 +283,15 @@ class Board:
         :param tile: tuple
         :return: list(tuple)
         """
-        piece: Piece = self.board[tile[1], tile[0]]
-
-        if piece.typ == "P":
-            return self.check_pawn_moves(tile)
-
-        # rooks
-        if piece.typ == "R":
-            moves = []
-            # upwards
-            moves.extend(self.check_above_line(tile))
-            # downwards
-            moves.extend(self.check_below_line(tile))
-            # right
-            moves.extend(self.check_right_line(tile))
-            # left
-            moves.extend(self.check_left_line(tile))
-
-            return moves
-
-        # bishops
-        if piece.typ == "B":
-            moves = []
-            # check left right diagonal
-            moves.extend(self.check_upper_left_right_diagonal(tile))
-            moves.extend(self.check_lower_left_right_diagonal(tile))
-            # check right left diagonal
-            moves.extend(self.check_upper_right_left_diagonal(tile))
-            moves.extend(self.check_lower_right_left_diagonal(tile))
-
-            return moves
-
-        # queens
-        if piece.typ == "Q":
-            moves = []
-            # check left right diagonal
-            moves.extend(self.check_upper_left_right_diagonal(tile))
-            moves.extend(self.check_lower_left_right_diagonal(tile))
-            # check right left diagonal
-            moves.extend(self.check_upper_right_left_diagonal(tile))
-            moves.extend(self.check_lower_right_left_diagonal(tile))
-            # upwards
-            moves.extend(self.check_above_line(tile))
-            # downwards
-            moves.extend(self.check_below_line(tile))
-            # right
-            moves.extend(self.check_right_line(tile))
-            # left
-            moves.extend(self.check_left_line(tile))
-            return moves
-
-        # kings
-        if piece.typ == "K":
-            return self.check_king_moves(tile)
-
-        # knights
-        if piece.typ == "N":
-            return self.check_knight_moves(tile)
+        return self.position.get_all_possible_moves(tile)
+
+    def get_legal_moves(self, tile):
+        """
+        Returns the moves of the piece on a tile that don't leave its own king in check.
+        :param tile: tuple
+        :return: list
+        """
+        return self.position.get_legal_moves(tile)
 
     def draw_capture_rect(self, tile, color=p.Color((211, 211, 211))):
         p.draw.rect(self.screen, color=color,
@@ -254,6 +300,8 @@ class Board:
                                 self.square_size * 0.8,
                                 self.square_size * 0.8), width=3,
                     border_radius=1)
+        self.overlays.add(tile)
+        self.dirty.append(self.tile_rect(tile))
 
     def draw_move_preview(self, tile_list):
         """
@@ -269,6 +317,8 @@ class Board:
                         tile[0] * self.square_size + self.square_size / 2,
                         tile[1] * self.square_size + self.square_size / 2),
                                   self.square_size / 3)
+                    self.overlays.add(tile)
+                    self.dirty.append(self.tile_rect(tile))
                 else:
                     self.draw_capture_rect(tile)
             elif tile == "short_castle":
@@ -283,427 +333,10 @@ class Board:
                 else:
                     self.draw_capture_rect((0, 0))
 
-    # all methods that check possible moves in a particular shape
-    def check_above_line(self, tile):
-        moves = []
-        og_piece: Piece = self.board[tile[1], tile[0]]
-        for y_up in range(tile[1] - 1, -1, -1):  # all moves above the rook
-            piece = self.board[y_up, tile[0]]
-            if piece == "-":
-                moves.append((tile[0], y_up))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (tile[0], y_up)))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((tile[0], y_up))
-                break
-            else:
-                break
-        return moves
-
-    def check_below_line(self, tile):
-        moves = []
-        og_piece: Piece = self.board[tile[1], tile[0]]
-        for y_down in range(tile[1] + 1, 8, 1):  # all moves below the rook
-            piece = self.board[y_down, tile[0]]
-            if piece == "-":
-                moves.append((tile[0], y_down))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (tile[0], y_down)))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((tile[0], y_down))
-                break
-            else:
-                break
-        return moves
-
-    def check_right_line(self, tile):
-        moves = []
-        og_piece: Piece = self.board[tile[1], tile[0]]
-        for x_right in range(tile[0] + 1, 8, 1):  # all moves to the right of the rook
-            piece = self.board[tile[1], x_right]
-            if piece == "-":
-                moves.append((x_right, tile[1]))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x_right, tile[1])))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((x_right, tile[1]))
-                break
-            else:
-                break
-        return moves
-
-    def check_left_line(self, tile):
-        moves = []
-        og_piece: Piece = self.board[tile[1], tile[0]]
-        for x_left in range(tile[0] - 1, -1, -1):  # all moves to the right of the rook
-            piece = self.board[tile[1], x_left]
-            if piece == "-":
-                moves.append((x_left, tile[1]))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x_left, tile[1])))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((x_left, tile[1]))
-                break
-            else:
-                break
-        return moves
-
-    def check_upper_left_right_diagonal(self, tile):
-        moves = []
-        x, y = tile[0] - 1, tile[1] - 1
-        og_piece = self.board[tile[1], tile[0]]
-        while x >= 0 and y >= 0:
-            piece = self.board[y, x]
-            if piece == "-":
-                moves.append((x, y))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x, y)))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((x, y))
-                break
-            x -= 1
-            y -= 1
-
-        return moves
-
-    def check_lower_left_right_diagonal(self, tile):
-        moves = []
-        x, y = tile[0] + 1, tile[1] + 1
-        og_piece = self.board[tile[1], tile[0]]
-        while x <= 7 and y <= 7:
-            piece = self.board[y, x]
-            if piece == "-":
-                moves.append((x, y))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x, y)))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((x, y))
-                break
-            x += 1
-            y += 1
-
-        return moves
-
-    def check_upper_right_left_diagonal(self, tile):
-        moves = []
-        x, y = tile[0] + 1, tile[1] - 1
-        og_piece = self.board[tile[1], tile[0]]
-        while x <= 7 and y >= 0:
-            piece = self.board[y, x]
-            if piece == "-":
-                moves.append((x, y))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x, y)))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((x, y))
-                break
-            x += 1
-            y -= 1
-
-        return moves
-
-    def check_lower_right_left_diagonal(self, tile):
-        moves = []
-        x, y = tile[0] - 1, tile[1] + 1
-        og_piece = self.board[tile[1], tile[0]]
-        while x >= 0 and y <= 7:
-            piece = self.board[y, x]
-            if piece == "-":
-                moves.append((x, y))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x, y)))
-                    break
-                elif (not piece.is_white() and og_piece.is_white()) or (piece.is_white() and not og_piece.is_white()):
-                    moves.append((x, y))
-                break
-            x -= 1
-            y += 1
-
-        return moves
-
-    def check_king_moves(self, tile):
-        moves = []
-        x_start = tile[0]
-        y_start = tile[1]
-        og_piece = self.board[tile[1], tile[0]]
-        for x in range(x_start - 1, x_start + 2):
-            for y in range(y_start - 1, y_start + 2):
-                if 0 <= x < 8 and 0 <= y < 8:
-                    piece = self.board[y, x]
-                    if piece == "-":
-                        moves.append((x, y))
-                    elif isinstance(piece, Piece):
-                        if piece.typ == "K" and piece.color != og_piece.color:
-                            pass
-                        elif (not piece.is_white() and og_piece.is_white()) or (
-                                piece.is_white() and not og_piece.is_white()):
-                            moves.append((x, y))
-
-        if self.check_short_castle():
-            moves.append("short_castle")
-
-        if self.check_long_castle():
-            moves.append("long_castle")
-
-        return moves
-
-    def check_short_castle(self):
-        white_king_moved = False
-        black_king_moved = False
-        for move in self.moveLog:
-            if (4, 7) == move[0]:
-                white_king_moved = True
-            elif (4, 0) == move[0]:
-                black_king_moved = True
-        if not white_king_moved and self.board[7, 5] == "-" and self.board[
-            7, 6] == "-" and isinstance(self.board[7, 7], Piece) and self.board[7, 7].get_image_name() == "wR":
-            return True
-        elif not black_king_moved and self.board[0, 5] == "-" and self.board[
-            0, 6] == "-" and isinstance(self.board[0, 7], Piece) and self.board[0, 7].get_image_name() == "bR":
-            return True
-
-        return False
-
-    def check_long_castle(self):
-
-        white_king_moved = False
-        black_king_moved = False
-        for move in self.moveLog:
-            if (4, 7) == move[0]:
-                white_king_moved = True
-            elif (4, 0) == move[0]:
-                black_king_moved = True
-        if not white_king_moved and self.board[7, 3] == "-" and self.board[
-            7, 2] == "-" and self.board[7, 1] == "-" and isinstance(self.board[7, 0], Piece) and self.board[
-            7, 0].get_image_name() == "wR":
-            return True
-        elif not black_king_moved and self.board[0, 3] == "-" and self.board[
-            0, 2] == "-" and self.board[0, 1] == "-" and isinstance(self.board[0, 0], Piece) and self.board[
-            0, 0].get_image_name() == "bR":
-            return True
-
-        return False
-
-    def short_castle(self, tile):
-        x_start = tile[0]
-        y_start = tile[1]
-        if self.whites_turn:
-            self.move_piece(tile, (tile[0] + 2, tile[1]))
-            self.move_piece((tile[0] + 3, tile[1]), (tile[0] + 1, tile[1]))
-            self.update_board()
-        else:
-            self.move_piece(tile, (tile[0] + 2, tile[1]))
-            self.move_piece((tile[0] + 3, tile[1]), (tile[0] + 1, tile[1]))
-            self.update_board()
-
-    def long_castle(self, tile):
-        x_start = tile[0]
-        y_start = tile[1]
-        if self.whites_turn:
-            self.move_piece(tile, (tile[0] - 2, tile[1]))
-            self.move_piece((tile[0] - 4, tile[1]), (tile[0] - 1, tile[1]))
-            self.update_board()
-        else:
-            self.move_piece(tile, (tile[0] - 2, tile[1]))
-            self.move_piece((tile[0] - 4, tile[1]), (tile[0] - 1, tile[1]))
-            self.update_board()
-
-    def check_knight_moves(self, tile):
-        moves = []
-        x = tile[0]
-        y = tile[1]
-        og_piece = self.board[tile[1], tile[0]]
-        # above right
-        if 0 <= x + 1 < 8 and 0 <= y - 2 < 8:
-            piece = self.board[y - 2, x + 1]
-            if piece == "-":
-                moves.append((x + 1, y - 2))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x + 1, y - 2)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x+1, y-2))
-
-        # above left
-        if 0 <= x - 1 < 8 and 0 <= y - 2 < 8:
-            piece = self.board[y - 2, x - 1]
-            if piece == "-":
-                moves.append((x - 1, y - 2))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x - 1, y - 2)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x-1, y-2))
-
-        # below right
-        if 0 <= x + 1 < 8 and 0 <= y + 2 < 8:
-            piece = self.board[y + 2, x + 1]
-            if piece == "-":
-                moves.append((x + 1, y + 2))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x + 1, y + 2)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x+1, y+2))
-        # below left
-        if 0 <= x - 1 < 8 and 0 <= y + 2 < 8:
-            piece = self.board[y + 2, x - 1]
-            if piece == "-":
-                moves.append((x - 1, y + 2))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x - 1, y + 2)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x-1, y+2))
-        # right above
-        if 0 <= x + 2 < 8 and 0 <= y - 1 < 8:
-            piece = self.board[y - 1, x + 2]
-            if piece == "-":
-                moves.append((x + 2, y - 1))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x + 2, y - 1)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x + 2, y - 1))
-        # right below
-        if 0 <= x + 2 < 8 and 0 <= y + 1 < 8:
-            piece = self.board[y + 1, x + 2]
-            if piece == "-":
-                moves.append((x + 2, y + 1))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x + 2, y + 1)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x + 2, y + 1))
-        # left above
-        if 0 <= x - 2 < 8 and 0 <= y - 1 < 8:
-            piece = self.board[y - 1, x - 2]
-            if piece == "-":
-                moves.append((x - 2, y - 1))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x - 2, y - 1)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x - 2, y - 1))
-        # left below
-        if 0 <= x - 2 < 8 and 0 <= y + 1 < 8:
-            piece = self.board[y + 1, x - 2]
-            if piece == "-":
-                moves.append((x - 2, y + 1))
-            elif isinstance(piece, Piece):
-                if piece.typ == "K" and piece.color != og_piece.color:
-                    self.checks.append((tile, (x - 2, y + 1)))
-                    pass
-                elif (not piece.is_white() and og_piece.is_white()) or (
-                        piece.is_white() and not og_piece.is_white()):
-                    moves.append((x - 2, y + 1))
-        return moves
-
-    def check_pawn_moves(self, tile):
-        piece: Piece = self.board[tile[1], tile[0]]
-        piece_u_l, piece_u_r, piece_l_l, piece_l_r, piece_u, piece_l = None, None, None, None, None, None
-        # check if out of bounds
-        if 0 <= tile[1] - 1 < 8 and 0 <= tile[0] - 1 < 8:
-            piece_u_l = self.board[tile[1] - 1, tile[0] - 1]
-        if 0 <= tile[1] - 1 < 8 and 0 <= tile[0] + 1 < 8:
-            piece_u_r = self.board[tile[1] - 1, tile[0] + 1]
-        if 0 <= tile[1] + 1 < 8 and 0 <= tile[0] - 1 < 8:
-            piece_l_l = self.board[tile[1] + 1, tile[0] - 1]
-        if 0 <= tile[1] + 1 < 8 and 0 <= tile[0] + 1 < 8:
-            piece_l_r = self.board[tile[1] + 1, tile[0] + 1]
-
-        if 0 <= tile[1] - 1 < 8:
-            piece_u = self.board[tile[1] - 1, tile[0]]
-        if 0 <= tile[1] + 1 < 8:
-            piece_l = self.board[tile[1] + 1, tile[0]]
-
-        moves = []
-        # white pawns
-        if piece.color == "w":
-            # check free space
-            if piece_u == "-":
-                moves.append((tile[0], tile[1] - 1))
-                # move 2 when on 6th rank
-                if tile[1] == 6 and self.board[tile[1] - 2, tile[0]] == "-":
-                    moves.append((tile[0], tile[1] - 2))
-            # check captures
-            if piece_u_l is not None and isinstance(piece_u_l, Piece):
-                if piece_u_l.typ == "K" and piece_u_l.color != piece.color:
-                    self.checks.append((tile, (tile[0]-1, tile[1]-1)))
-                elif not piece_u_l.is_white():
-                    moves.append((tile[0] - 1, tile[1] - 1))
-            if piece_u_r is not None and isinstance(piece_u_r, Piece):
-                if piece_u_r.typ == "K" and piece_u_r.color != piece.color:
-                    self.checks.append((tile, (tile[0] + 1, tile[1] - 1)))
-                elif not piece_u_r.is_white():
-                    moves.append((tile[0] + 1, tile[1] - 1))
-
-            # TODO: check en passant
-
-        # black pawns
-        elif piece.color == "b":
-            # check free space
-            if piece_l == "-":
-                moves.append((tile[0], tile[1] + 1))
-                # move 2 when on 1st rank
-                if tile[1] == 1 and self.board[tile[1] + 2, tile[0]] == "-":
-                    moves.append((tile[0], tile[1] + 2))
-            # check captures
-            if piece_l_l is not None and isinstance(piece_l_l, Piece):
-                if piece_l_l.typ == "K" and piece_l_l.color != piece.color:
-                    self.checks.append((tile, (tile[0] - 1, tile[1] + 1)))
-                elif piece_l_l.is_white():
-                    moves.append((tile[0] - 1, tile[1] + 1))
-            if piece_l_r is not None and isinstance(piece_l_r, Piece):
-                if piece_l_r.typ == "K" and piece_l_r.color != piece.color:
-                    self.checks.append((tile, (tile[0] + 1, tile[1] + 1)))
-                elif piece_l_r.is_white():
-                    moves.append((tile[0] + 1, tile[1] + 1))
-            # TODO: check en passant
-
-        return moves
-
     def check_for_checks(self):
-        self.checks = []
-        for i in range(self.board.shape[0]):
-            for j in range(self.board.shape[1]):
-                if self.board[j, i] == "-":
-                    pass
-                else:
-                    self.get_all_possible_moves((i, j))
+        self.position.check_for_checks()
         if len(self.checks) > 0:
-            print("moin")
             self.check()
-            print(self.checks)
 
     def check(self):
         self.draw_capture_rect(self.checks[0][1], color=p.Color("Red"))
@@ -711,40 +344,18 @@ class Board:
             p.mixer.Sound.play(self.check_sound)
         self.in_check = True
 
-    def handle_check(self, tile, possible_moves):
-        moves = []
-        checks_tmp = self.checks
-        board_tmp = self.board.copy()
-        self.sound_on = False
-        for move in possible_moves:
-            board_tmp = self.board.copy()
-            self.move_piece(tile, move)
-            self.check_for_checks()
-            if len(self.checks) == 0:
-                moves.append(move)
-            self.checks = checks_tmp
-            self.board = board_tmp.copy()
-            self.update_board()
-        self.sound_on = True
-        print(moves)
-        return moves
-
-    def check_checkmate(self):
-        moves = []
-        self.sound_on = False
-        for x in range(self.board.shape[0]):
-            for y in range(self.board.shape[1]):
-                tile = (x, y)
-                piece = self.board[y, x]
-                if piece == "-":
-                    pass
-                elif (piece.is_white() and not self.whites_turn) or (not piece.is_white() and self.whites_turn):
-                    possible_moves = self.get_all_possible_moves(tile)
-                    possible_moves = self.handle_check(tile, possible_moves)
-                    if len(possible_moves) > 0:
-                        moves.append(possible_moves)
-        self.sound_on = True
-        if len(moves) == 0:
-            p.mixer.Sound.play(self.checkmate_sound)
-            return True
-        return False
+    def checkmate(self):
+        p.mixer.Sound.play(self.checkmate_sound)
+
+    def game_over(self, result):
+        """
+        Shows how the game ended in the window title.
+        :param result: str, a result of Position.game_result
+        """
+        if result == CHECKMATE:
+            self.checkmate()
+            # the side to move is the one that got mated
+            winner = "black" if self.whites_turn else "white"
+            p.display.set_caption("Checkmate, {} wins".format(winner))
+        else:
+            p.display.set_caption("Draw by {}".format(result))
@@ -0,0 +1,152 @@
+"""
+Opening book in a sorted binary file that is memory-mapped and binary searched, so opening it reads nothing and
+a lookup touches only the few pages it needs, whatever the size of the book.
+
+The layout is the one of Polyglot books: 16 byte big endian entries of position key (8 bytes), move (2 bytes),
+weight (2 bytes) and a learn field (4 bytes, unused), sorted by key and within a key by descending weight. The
+keys are Position.zobrist_key() and the moves the 16 bit integers of the Move module, not the Polyglot ones, so
+the files are only read by this module.
+
+Building a book from a PGN collection, from the src directory:
+    python Book.py games.pgn book.bin --plies 20
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+import Move
+from Pgn import read_games
+from Position import Position
+
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+# weight of a move per game it was played in, by the result for the side that played it
+WIN_WEIGHT, DRAW_WEIGHT = 2, 1
+
+
+class Book:
+    def __init__(self, path):
+        """
+        :param path: str, book file written by build_book
+        """
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # an empty file can't be mapped, it is a book without entries
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+        self.count = size // ENTRY.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def entries(self, key):
+        """
+        Returns the book moves of a position key, best weighted first.
+        :param key: int, Position.zobrist_key()
+        :return: list of move: int, weight: int
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        for index in range(low, self.count):
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.data, index * ENTRY.size)
+            if entry_key != key:
+                break
+            moves.append((move, weight))
+        return moves
+
+    def moves(self, position):
+        """
+        Returns the book moves of a position in the format of Position.make_move.
+        :param position: Position
+        :return: list of move: tuple of tile, target and promotion, weight: int
+        """
+        return [(Move.to_tiles(move), weight) for move, weight in self.entries(position.zobrist_key())]
+
+    def choose(self, position, rng=random):
+        """
+        Picks one of the book moves of a position, each with a chance proportional to its weight.
+        :param position: Position
+        :param rng: random.Random, the random module by default
+        :return: tuple of tile, target and promotion, None if the position is not in the book
+        """
+        moves = self.moves(position)
+        if len(moves) == 0:
+            return None
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def build_book(pgn_path, book_path, plies=20):
+    """
+    Compiles the opening moves of a PGN collection into a book file. A game stops counting at its first illegal
+    move.
+    :param pgn_path: str
+    :param book_path: str
+    :param plies: int, moves of every game that go into the book
+    :return: games: int, entries: int
+    """
+    # (key, move) -> weight
+    weights = {}
+    games = 0
+    for game in read_games(pgn_path):
+        games += 1
+        position = Position.from_fen(game.start_fen())
+        try:
+            for ply, (_, move) in enumerate(game.positions()):
+                if ply >= plies:
+                    break
+                if game.result == "1/2-1/2":
+                    weight = DRAW_WEIGHT
+                elif game.result in ("1-0", "0-1"):
+                    weight = WIN_WEIGHT if (game.result == "1-0") == position.whites_turn else 0
+                else:
+                    weight = DRAW_WEIGHT
+                entry = (position.zobrist_key(), move)
+                weights[entry] = weights.get(entry, 0) + weight
+                position.make_move(*Move.to_tiles(move))
+        except ValueError:
+            pass
+
+    # moves that only ever lost stay out, the rest is scaled into 16 bits
+    entries = [(key, move, weight) for (key, move), weight in weights.items() if weight > 0]
+    top = max((weight for _, _, weight in entries), default=0)
+    scale = min(1.0, 0xFFFF / top) if top > 0 else 1.0
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(book_path, "wb") as file:
+        for key, move, weight in entries:
+            file.write(ENTRY.pack(key, move, max(1, int(weight * scale)), 0))
+    return games, len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compiles a PGN collection into an opening book.")
+    parser.add_argument("pgn", help="PGN file to read")
+    parser.add_argument("book", help="book file to write")
+    parser.add_argument("--plies", type=int, default=20, help="moves of every game that go into the book")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    games, entries = build_book(args.pgn, args.book, args.plies)
+    print("{} games, {} entries, {} bytes in {:.2f} s".format(games, entries, entries * ENTRY.size,
+                                                             time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
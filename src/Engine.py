@@ -0,0 +1,314 @@
+import time
+
+import Evaluation
+import Move
+from Bitboard import BitboardPosition, PIECE_TYPES
+
+PIECE_VALUES = {"P": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+# PIECE_VALUES by the piece types of Bitboard
+TYPE_VALUES = [PIECE_VALUES[typ] for typ in PIECE_TYPES]
+MATE = 100000
+# scores beyond this are mates, the difference to MATE counts the plies until it
+MATE_BOUND = MATE - 1000
+INFINITY = 1000000
+# how a transposition table score relates to the real one
+EXACT, LOWER, UPPER = 0, 1, 2
+# the clock is polled every CHECK_INTERVAL + 1 nodes, a few milliseconds
+CHECK_INTERVAL = 127
+# share of the remaining clock spent on one move when playing with a game clock
+MOVES_TO_GO = 30
+# a move never takes more than this share of the clock less the margin in seconds, whatever the increment
+MAX_CLOCK_SHARE, CLOCK_MARGIN = 0.8, 0.05
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def clock_budget(remaining, increment):
+    """
+    Returns the time to think about one move when playing with a game clock. A large increment only counts as
+    far as the clock can pay for it, the increment is added after the move.
+    :param remaining: float, seconds left on the clock
+    :param increment: float, seconds added per move
+    :return: float, seconds
+    """
+    return max(0.0, min(remaining / MOVES_TO_GO + increment / 2, remaining * MAX_CLOCK_SHARE - CLOCK_MARGIN))
+
+
+class Engine:
+    """
+    Negamax alpha-beta search with iterative deepening over a Position.
+
+    The tree is searched on a BitboardPosition built from it, which generates and makes moves several times
+    faster and can generate the captures of the quiescence search alone. Moves are searched in the order
+    transposition table move, captures by MVV-LVA, killer moves, then the rest. The search stops when its time
+    budget runs out or stop() is called and returns the best move of the deepest iteration it completed. The
+    first iteration is always completed, however short the budget. With an opening book, positions in the book
+    are answered from it without searching.
+    """
+
+    def __init__(self, time_budget=3.0, max_depth=64, table_size=1 << 20, book=None):
+        """
+        :param book: Book or None
+        """
+        self.book = book
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        # zobrist key -> depth, score with mates counted from the entry's position, flag, best move
+        self.table = {}
+        self.killers = []
+        self.nodes = 0
+        self.deadline = 0.0
+        self.stopped = False
+        # False while an iteration runs that must not be cut off
+        self.interruptible = True
+        # optional callable polled with the clock, a search stops once it returns True
+        self.stop_check = None
+
+    def stop(self):
+        """
+        Makes a running search return with the result of its last completed iteration.
+        """
+        self.stopped = True
+
+    def search(self, position, time_budget=None, max_depth=None):
+        """
+        Searches for the best move of the side to move. The position is left as it was.
+        :param position: Position
+        :param time_budget: float, seconds, defaults to the engine's budget
+        :param max_depth: int, defaults to the engine's maximum depth
+        :return: move: tuple of tile, target and promotion or None without legal moves, score: int from the
+            view of the side to move, depth: int, the deepest completed iteration
+        """
+        max_depth = self.max_depth if max_depth is None else max_depth
+        self._start(time_budget, max_depth)
+
+        moves = position.legal_moves()
+        if len(moves) == 0:
+            return None, self._terminal_score(position.king_in_check(position.whites_turn), 0), 0
+        if self.book is not None:
+            book_move = self.book.choose(position)
+            if book_move in moves:
+                return book_move, self.evaluate(position), 0
+        root = BitboardPosition.from_position(position)
+        # searched in the order of Position.legal_moves, like ParallelSearch does
+        tiles = {position.encode_move(*move): move for move in moves}
+        root_moves = list(tiles)
+        best_move, best_score, completed = root_moves[0], 0, 0
+        for depth in range(1, max_depth + 1):
+            # without a completed iteration there is no searched move to return
+            self.interruptible = depth > 1
+            try:
+                best_score, best_move = self._search_root(root, root_moves, depth)
+            except SearchTimeout:
+                break
+            completed = depth
+            # the best move of this iteration goes first in the next one
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            if abs(best_score) >= MATE - max_depth - 64:
+                break
+        return tiles[best_move], best_score, completed
+
+    def score_move(self, position, move, depth, alpha=-INFINITY, beta=INFINITY, time_budget=None):
+        """
+        Searches the subtree of a single root move, which lets root moves be shared out between processes.
+        :param position: Position
+        :param move: tuple, a legal move of the side to move
+        :param depth: int, depth counted from the root
+        :param alpha: int, the move only needs to be scored exactly if it is better than this
+        :param beta: int
+        :param time_budget: float, seconds, defaults to the engine's budget
+        :return: int, score from the view of the side to move, None when the search was stopped
+        """
+        self._start(time_budget, depth)
+        child = BitboardPosition.from_position(position).make_move(position.encode_move(*move))
+        try:
+            return -self._negamax(child, depth - 1, -beta, -alpha, 1)
+        except SearchTimeout:
+            return None
+
+    def _start(self, time_budget, max_depth):
+        time_budget = self.time_budget if time_budget is None else time_budget
+        self.deadline = time.perf_counter() + time_budget
+        self.stopped = False
+        self.interruptible = True
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(max_depth + 64)]
+        if len(self.table) > self.table_size:
+            self.table.clear()
+
+    def _search_root(self, position, moves, depth):
+        alpha = -INFINITY
+        best_move = moves[0]
+        for move in moves:
+            score = -self._negamax(position.make_move(move), depth - 1, -INFINITY, -alpha, 1)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self.table[position.zobrist_key()] = (depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _check_time(self):
+        if not self.interruptible:
+            return
+        if time.perf_counter() > self.deadline or self.stopped:
+            raise SearchTimeout()
+        if self.stop_check is not None and self.stop_check():
+            raise SearchTimeout()
+
+    def _negamax(self, position, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & CHECK_INTERVAL == 0:
+            self._check_time()
+
+        key = position.zobrist_key()
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, entry_score, flag, table_move = entry
+            if entry_depth >= depth:
+                entry_score = self._from_table(entry_score, ply)
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER and entry_score >= beta:
+                    return entry_score
+                if flag == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        if depth <= 0:
+            return self._quiescence(position, alpha, beta)
+
+        moves = position.legal_moves()
+        if len(moves) == 0:
+            return self._terminal_score(position.in_check(), ply)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        killers = self.killers[ply]
+        for move in self._order_moves(position, moves, table_move, killers):
+            score = -self._negamax(position.make_move(move), depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not move >> 12 & Move.CAPTURE and move != killers[0]:
+                            killers[1] = killers[0]
+                            killers[0] = move
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, self._to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def _quiescence(self, position, alpha, beta):
+        self.nodes += 1
+        if self.nodes & CHECK_INTERVAL == 0:
+            self._check_time()
+
+        stand_pat = self.evaluate(position)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        captures = position.legal_moves(captures_only=True)
+        captures.sort(key=lambda move: self._mvv_lva(position, move), reverse=True)
+        for move in captures:
+            score = -self._quiescence(position.make_move(move), -beta, -alpha)
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def _order_moves(self, position, moves, table_move, killers):
+        def priority(move):
+            if move == table_move:
+                return 3 * INFINITY
+            if move >> 12 & Move.CAPTURE:
+                return 2 * INFINITY + self._mvv_lva(position, move)
+            if move == killers[0]:
+                return INFINITY + 1
+            if move == killers[1]:
+                return INFINITY
+            return 0
+
+        return sorted(moves, key=priority, reverse=True)
+
+    @staticmethod
+    def captured_value(position, move):
+        """
+        Returns the value of the piece a move captures, 0 for quiet moves.
+        :param position: BitboardPosition
+        :param move: int
+        :return: int
+        """
+        flags = move >> 12
+        if not flags & Move.CAPTURE:
+            return 0
+        if flags == Move.EN_PASSANT:
+            return PIECE_VALUES["P"]
+        return TYPE_VALUES[Engine._piece_type(position, move >> 6 & 63)]
+
+    def _mvv_lva(self, position, move):
+        # most valuable victim first, least valuable attacker breaks ties
+        return 10 * self.captured_value(position, move) - TYPE_VALUES[self._piece_type(position, move & 63)]
+
+    @staticmethod
+    def _piece_type(position, square):
+        bit = 1 << square
+        pieces = position.pieces
+        for index in range(12):
+            if pieces[index] & bit:
+                return index % 6
+        return None
+
+    @staticmethod
+    def _to_table(score, ply):
+        # mates are stored as distances from the entry's position, so they stay right when it is reached at
+        # another ply through a transposition
+        if score > MATE_BOUND:
+            return score + ply
+        if score < -MATE_BOUND:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _from_table(score, ply):
+        if score > MATE_BOUND:
+            return score - ply
+        if score < -MATE_BOUND:
+            return score + ply
+        return score
+
+    @staticmethod
+    def _terminal_score(in_check, ply):
+        """
+        Returns the score of a position without legal moves.
+        :param in_check: bool, whether the side to move is in check
+        :param ply: int, distance from the root
+        :return: int
+        """
+        if in_check:
+            return -MATE + ply
+        return 0
+
+    @staticmethod
+    def evaluate(position):
+        """
+        Returns the tapered material and piece-square score from the view of the side to move, which the
+        position keeps up to date with every move.
+        :param position: Position or BitboardPosition
+        :return: int
+        """
+        return Evaluation.evaluate(position)
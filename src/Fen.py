@@ -0,0 +1,61 @@
+"""
+Streams positions out of text files with one FEN per line, e.g. regression positions or puzzle sets, without
+building a Board or touching pygame.
+
+Empty lines and lines starting with # are skipped. EPD style operations after the position fields, like
+"bm Nf3;", are ignored.
+"""
+from Bitboard import BitboardPosition
+from Position import Position
+
+
+def read_fens(path):
+    """
+    Yields the FEN of every position line of a file, read line by line so files of any size can be streamed.
+    :param path: str
+    :return: generator of line number: int, fen: str
+    """
+    with open(path) as file:
+        for number, line in enumerate(file, start=1):
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith("#"):
+                continue
+            # halfmove clock and fullmove number are optional, EPD puts operations there instead
+            if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+                yield number, " ".join(fields[:6])
+            else:
+                yield number, " ".join(fields[:4])
+
+
+def load_positions(path, bitboard=False):
+    """
+    Yields the positions of a FEN file one by one.
+    :param path: str
+    :param bitboard: bool, yield BitboardPosition instead of Position
+    :return: generator of Position or BitboardPosition
+    """
+    for number, fen in read_fens(path):
+        try:
+            position = Position.from_fen(fen)
+        except ValueError as error:
+            raise ValueError("{}:{}: {}".format(path, number, error)) from None
+        yield BitboardPosition.from_position(position) if bitboard else position
+
+
+def load_batches(path, size=4096, bitboard=False):
+    """
+    Yields the positions of a FEN file in lists of up to size positions, for handing them to batch move
+    generation or evaluation.
+    :param path: str
+    :param size: int
+    :param bitboard: bool, yield BitboardPosition instead of Position
+    :return: generator of list
+    """
+    batch = []
+    for position in load_positions(path, bitboard):
+        batch.append(position)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
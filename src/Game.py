@@ -1,7 +1,10 @@
 import pygame as p
+from Analysis import BackgroundWorker
 from Board import Board
+from MoveCache import MoveCache
 from Piece import Piece
 
+# size the window opens with, it can be resized freely afterwards
 WIDTH, HEIGHT = 512, 512
 MAX_FPS = 60
 
@@ -9,10 +12,116 @@ MAX_FPS = 60
 class Game:
     run = True
 
-    def __init__(self):
-        self.WIN = p.display.set_mode((WIDTH, HEIGHT))
-        self.board = Board(WIDTH, self.WIN)
+    def __init__(self, ai_color=None, think_time=3.0, fen=None, book=None):
+        """
+        :param ai_color: str, "w" or "b" for the color the engine plays, None for two human players
+        :param think_time: float, seconds the engine may search per move
+        :param fen: str, position to start from instead of the initial one
+        :param book: str, path of an opening book built with Book.py for the engine
+        """
+        self.WIN = p.display.set_mode((WIDTH, HEIGHT), p.RESIZABLE)
+        self.board = Board(min(WIDTH, HEIGHT), self.WIN)
+        if fen is not None:
+            self.board.load_fen(fen)
         self.clock = p.time.Clock()
+        self.ai_color = ai_color
+        self.think_time = think_time
+        # searches and legal move generation run in another process, the loop only polls their futures
+        self.worker = BackgroundWorker(book)
+        self.search_future = None
+        self.search_key = None
+        # legal moves of the positions seen so far, the worker fills in the shown one ahead of the first click
+        self.move_cache = MoveCache()
+        # zobrist key -> Future of an analysis that hasn't come back yet
+        self.analyses = {}
+        self.start_analysis()
+        self.check_game_over()
+
+    def ai_to_move(self):
+        return self.ai_color is not None and self.board.can_move() and self.board.whites_turn == (
+                self.ai_color == "w")
+
+    def position_key(self):
+        return self.board.position.zobrist_key(), self.board.position.ply
+
+    def play_move(self, tile1, tile2, promotion="Q"):
+        """
+        Plays a legal move on the board and hands the turn to the other side, then checks whether it ended
+        the game.
+        :param tile1: tuple
+        :param tile2: tuple or "short_castle"/"long_castle"
+        :param promotion: str
+        """
+        self.board.checks = []
+        if self.board.in_check:
+            self.board.in_check = False
+        self.board.move_piece(tile1, tile2, promotion)
+        self.board.check_for_checks()
+        if self.board.whites_turn:
+            self.board.whites_turn = False
+        else:
+            self.board.whites_turn = True
+        self.start_analysis()
+        self.check_game_over()
+
+    def check_game_over(self):
+        """
+        Ends the game on checkmate, stalemate or insufficient material. This runs right after every move, the
+        search for a single legal move returns early and takes a few milliseconds.
+        """
+        result = self.board.position.game_result()
+        if result is not None:
+            self.board.game_over(result)
+            self.run = False
+
+    def start_analysis(self):
+        """
+        Has the worker generate the legal moves of the shown position unless they are cached or on their way.
+        """
+        key = self.board.position.zobrist_key()
+        if key not in self.move_cache and key not in self.analyses:
+            self.analyses[key] = self.worker.analyse(self.board.position)
+
+    def get_legal_moves(self, tile):
+        """
+        Returns the legal moves of the piece on a tile from the cache, generating the moves of the whole
+        position if the background analysis hasn't delivered them yet.
+        :param tile: tuple
+        :return: list
+        """
+        return self.move_cache.lookup(self.board.position)[0].get(tile, [])
+
+    def poll_worker(self):
+        """
+        Picks up finished background work and starts a search when it is the engine's turn.
+        """
+        for key, future in list(self.analyses.items()):
+            if future.done():
+                del self.analyses[key]
+                self.move_cache.put(key, *future.result())
+
+        if self.search_future is not None:
+            if self.search_future.done():
+                move = self.search_future.result()[0]
+                self.search_future = None
+                if move is not None and self.search_key == self.position_key() and self.ai_to_move():
+                    self.play_move(*move)
+        elif self.run and self.ai_to_move():
+            self.search_key = self.position_key()
+            self.search_future = self.worker.search(self.board.position, self.think_time)
+
+    def stop_thinking(self):
+        if self.search_future is not None:
+            self.worker.cancel()
+            self.search_future = None
+
+    def resize(self, width, height):
+        self.WIN = p.display.get_surface()
+        self.board.resize(min(width, height))
+
+    def quit(self):
+        self.worker.shutdown()
+        exit(0)
 
     def main_loop(self):
 
@@ -22,33 +131,50 @@ class Game:
         while 1:
             for event in p.event.get():
                 if event.type == p.QUIT:
-                    exit(0)
+                    self.quit()
+                if event.type == p.WINDOWEXPOSED:
+                    self.board.invalidate()
+                if event.type == p.VIDEORESIZE:
+                    self.resize(event.w, event.h)
+            self.clock.tick(MAX_FPS)
+            self.board.present()
             while self.run:
                 for event in p.event.get():
                     if event.type == p.QUIT:
-                        self.run = False
+                        self.quit()
+                    if event.type == p.WINDOWEXPOSED:
+                        self.board.invalidate()
+
+                    if event.type == p.VIDEORESIZE:
+                        self.resize(event.w, event.h)
+                        # bring back the highlight of the selected piece
+                        if on_tile_clicked:
+                            self.board.clicked_on_tile(store_tile)
+                            self.board.draw_move_preview(possible_moves)
 
                     if event.type == p.MOUSEBUTTONUP:
 
                         pos = p.mouse.get_pos()
                         tile = self.board.get_tile_from_pixel_coords(pos)
+                        if not self.board.is_on_board(tile):
+                            continue
                         board_tile = (tile[1], tile[0])
                         piece = self.board.board[board_tile]
 
                         # make sure only white can move when it's whites  turn and viceversa
-                        if isinstance(piece, Piece) and not on_tile_clicked and self.board.can_move():
-                            if (self.board.whites_turn and piece.is_white()) or (
-                                    not self.board.whites_turn and not piece.is_white()):
-                                on_tile_clicked = True
-                                store_tile = tile
-                                self.board.update_board()
-                                self.board.clicked_on_tile(tile)
-                                possible_moves = self.board.get_all_possible_moves(tile)
-                                if self.board.in_check:
-                                    possible_moves = self.board.handle_check(tile, possible_moves)
-                                self.board.draw_move_preview(possible_moves)
-                                if possible_moves is None:
-                                    on_tile_clicked = False
+                        if isinstance(piece, Piece) and not on_tile_clicked and self.board.can_move() and not \
+                                self.ai_to_move():
+                            if piece.white == self.board.whites_turn:
+                                possible_moves = self.get_legal_moves(tile)
+                                # a piece without legal moves stays unselected
+                                if possible_moves:
+                                    on_tile_clicked = True
+                                    store_tile = tile
+                                    self.board.update_board()
+                                    self.board.clicked_on_tile(tile)
+                                    self.board.draw_move_preview(possible_moves)
+                                else:
+                                    possible_moves = None
 
                         # check if clicked on same tile again and remove possible moves
                         elif possible_moves is not None and (tile == store_tile or (
@@ -61,44 +187,36 @@ class Game:
                         #  you are not on an  earlier move
                         elif on_tile_clicked and possible_moves is not None and self.board.can_move():
 
+                            on_tile_clicked = False
                             if tile in possible_moves:
-                                self.board.checks = []
-                                if self.board.in_check:
-                                    self.board.in_check = False
-                                self.board.move_piece(store_tile, tile)
-                                self.board.check_for_checks()
-                                if self.board.in_check:
-                                    if self.board.check_checkmate():
-                                        self.run = False
-                                        break
-
-                                    self.board.handle_check(tile, possible_moves)
-                                if self.board.whites_turn:
-                                    self.board.whites_turn = False
-                                else:
-                                    self.board.whites_turn = True
+                                self.play_move(store_tile, tile)
 
                             # handle castling
-                            elif self.board.whites_turn and tile == (7, 7) and "short_castle" in possible_moves:
-                                self.board.move_piece(store_tile, "short_castle")
-                                self.board.whites_turn = False
-                            elif not self.board.whites_turn and tile == (7, 0) and "short_castle" in possible_moves:
-                                self.board.move_piece(store_tile, "short_castle")
-                                self.board.whites_turn = True
-                            elif self.board.whites_turn and tile == (0, 7) and "long_castle" in possible_moves:
-                                self.board.move_piece(store_tile, "long_castle")
-                                self.board.whites_turn = False
-                            elif not self.board.whites_turn and tile == (0, 0) and "long_castle" in possible_moves:
-                                self.board.move_piece(store_tile, "long_castle")
-                                self.board.whites_turn = True
-
-                            on_tile_clicked = False
+                            elif tile == (7, 7 if self.board.whites_turn else 0) and "short_castle" in possible_moves:
+                                self.play_move(store_tile, "short_castle")
+                            elif tile == (0, 7 if self.board.whites_turn else 0) and "long_castle" in possible_moves:
+                                self.play_move(store_tile, "long_castle")
 
                     if event.type == p.KEYDOWN:
                         if event.key == p.K_LEFT:
+                            self.stop_thinking()
                             self.board.undo_move()
+                            self.start_analysis()
                         elif event.key == p.K_RIGHT:
+                            self.stop_thinking()
                             self.board.move_forward()
+                            self.start_analysis()
+                        elif event.key == p.K_HOME:
+                            self.stop_thinking()
+                            self.board.go_to_start()
+                            self.start_analysis()
+                        elif event.key == p.K_END:
+                            self.stop_thinking()
+                            self.board.go_to_end()
+                            self.start_analysis()
+
+                self.poll_worker()
 
                 self.clock.tick(MAX_FPS)
-                p.display.flip()
\ No newline at end of file
+                # only the tiles that changed go to the display, idle frames push nothing
+                self.board.present()
\ No newline at end of file
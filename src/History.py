@@ -0,0 +1,64 @@
+"""
+Move history of a game that can restore the position after any ply.
+
+Every KEYFRAME_INTERVAL plies the position is stored packed with Position.pack, in between only the moves. Going
+to a ply unpacks the keyframe before it and replays at most KEYFRAME_INTERVAL - 1 moves, so a jump costs the same
+at ply 5 and at ply 400, and captured pieces come back because nothing is reconstructed backwards.
+"""
+
+from array import array
+
+import Move
+
+KEYFRAME_INTERVAL = 16
+
+
+class History:
+    def __init__(self, position):
+        """
+        :param position: Position, the position the game starts from
+        """
+        self.start_white = position.whites_turn
+        self.start_fullmove = position.fullmove_number
+        # keyframes[i] is the packed position after i * KEYFRAME_INTERVAL plies
+        self.keyframes = [position.pack()]
+        # every ply as a 16 bit integer of the Move module, two bytes each
+        self.moves = array("H")
+        # halfmove clock after every ply, starting with the one of the start position
+        self.clocks = array("H", [position.halfmove_clock])
+
+    def __len__(self):
+        return len(self.moves)
+
+    def record(self, position, move):
+        """
+        Adds a ply that was just played on the position.
+        :param position: Position, after the move
+        :param move: int, encoded with Position.encode_move before the move was played
+        """
+        self.moves.append(move)
+        self.clocks.append(position.halfmove_clock)
+        if len(self.moves) % KEYFRAME_INTERVAL == 0:
+            self.keyframes.append(position.pack())
+
+    def white_to_move(self, ply):
+        return self.start_white == (ply % 2 == 0)
+
+    def position_at(self, ply):
+        """
+        Returns a new position as it was after a number of plies.
+        :param ply: int, between 0 and len(self)
+        :return: Position
+        """
+        # imported here, Position imports this module
+        from Position import Position
+
+        keyframe = ply // KEYFRAME_INTERVAL
+        position = Position.unpack(self.keyframes[keyframe])
+        position.whites_turn = self.white_to_move(keyframe * KEYFRAME_INTERVAL)
+        for move in self.moves[keyframe * KEYFRAME_INTERVAL:ply]:
+            position.make_move(*Move.to_tiles(move))
+        position.undo_stack = []
+        position.halfmove_clock = self.clocks[ply]
+        position.fullmove_number = self.start_fullmove + (ply + (0 if self.start_white else 1)) // 2
+        return position
@@ -0,0 +1,92 @@
+"""
+16 bit move encoding shared by the move generators.
+
+Bits 0-5 hold the from square, bits 6-11 the to square and bits 12-15 the flags. Squares are numbered
+y * 8 + x, so square 0 is the top left tile (a8) and square 63 the bottom right one (h1), matching the
+(x, y) tiles used by Board and Position.
+"""
+
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+SHORT_CASTLE = 2
+LONG_CASTLE = 3
+CAPTURE = 4
+EN_PASSANT = 5
+# promotions set this bit, the low two bits pick the piece out of PROMOTION_PIECES
+PROMOTION = 8
+PROMOTION_PIECES = "NBRQ"
+
+
+def encode(from_square, to_square, flags=QUIET):
+    return from_square | to_square << 6 | flags << 12
+
+
+def from_square(move):
+    return move & 63
+
+
+def to_square(move):
+    return move >> 6 & 63
+
+
+def flags(move):
+    return move >> 12
+
+
+def is_capture(move):
+    return move >> 12 & CAPTURE != 0
+
+
+def promotion(move):
+    """
+    Returns the type of the piece a pawn promotes to with this move.
+    :param move: int
+    :return: str or None
+    """
+    if move >> 12 & PROMOTION:
+        return PROMOTION_PIECES[move >> 12 & 3]
+    return None
+
+
+def square_to_tile(square):
+    return square & 7, square >> 3
+
+
+def tile_to_square(tile):
+    return tile[1] * 8 + tile[0]
+
+
+def tile_name(tile):
+    """
+    Returns the algebraic name of a tile, e.g. "e4" for (4, 4).
+    :param tile: tuple
+    :return: str
+    """
+    return "abcdefgh"[tile[0]] + str(8 - tile[1])
+
+
+def to_tiles(move):
+    """
+    Decodes a move into the tile, target and promotion Position.make_move takes.
+    :param move: int
+    :return: tuple
+    """
+    tile = square_to_tile(move & 63)
+    move_flags = move >> 12
+    if move_flags == SHORT_CASTLE:
+        return tile, "short_castle", "Q"
+    if move_flags == LONG_CASTLE:
+        return tile, "long_castle", "Q"
+    return tile, square_to_tile(move >> 6 & 63), promotion(move) or "Q"
+
+
+def name(move):
+    """
+    Returns a move in coordinate notation, e.g. "e2e4" or "e7e8q".
+    :param move: int
+    :return: str
+    """
+    text = tile_name(square_to_tile(from_square(move))) + tile_name(square_to_tile(to_square(move)))
+    if move >> 12 & PROMOTION:
+        text += PROMOTION_PIECES[move >> 12 & 3].lower()
+    return text
@@ -0,0 +1,71 @@
+"""
+Bounded least recently used cache of the legal moves of positions, so reselecting a piece or coming back to a
+position while going through the history doesn't generate its moves again.
+
+Entries are keyed by the Zobrist key including the side to move, which covers castling rights and the en
+passant tile, so the same position reached by different move orders or plies shares one entry.
+"""
+from collections import OrderedDict
+
+
+def analyse(position):
+    """
+    Generates the legal moves of the side to move grouped by tile and whether it is in check.
+    :param position: Position
+    :return: moves: dict(tile, list), in_check: bool
+    """
+    moves = {}
+    for tile, move in position.get_all_legal_moves():
+        moves.setdefault(tile, []).append(move)
+    return moves, position.king_in_check(position.whites_turn)
+
+
+class MoveCache:
+    def __init__(self, size=4096):
+        """
+        :param size: int, entries kept before the least recently used one is dropped
+        """
+        self.size = size
+        # zobrist key -> moves per tile, in check
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """
+        Returns the entry of a position and marks it as recently used.
+        :param key: int, Position.zobrist_key()
+        :return: tuple of moves: dict(tile, list) and in_check: bool, None if not cached
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, moves, in_check):
+        self.entries[key] = (moves, in_check)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def lookup(self, position):
+        """
+        Returns the legal moves and check status of a position, generating and caching them on a miss.
+        :param position: Position
+        :return: moves: dict(tile, list), in_check: bool
+        """
+        key = position.zobrist_key()
+        entry = self.get(key)
+        if entry is None:
+            entry = analyse(position)
+            self.put(key, *entry)
+        return entry
@@ -0,0 +1,126 @@
+"""
+Root-splitting alpha-beta search over a pool of processes.
+
+The best move of the previous iteration is searched first with a full window. Its score becomes alpha for
+all other root moves, which are then searched at the same time, one task per move, each worker keeping its own
+transposition table between tasks. This gives the same best move and score as Engine.search for the same
+depth and move order. Positions are sent to the workers packed with Position.pack. Like Engine, the first
+iteration is never cut off by the clock and positions in an opening book are answered from it.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Engine import Engine, INFINITY, MATE
+from Position import Position
+
+_engine = None
+_generation = None
+
+
+def _init_worker(generation):
+    global _engine, _generation
+    _engine = Engine()
+    _generation = generation
+
+
+def _score_move(packed, move, depth, alpha, time_budget, generation):
+    _engine.stop_check = lambda: _generation.value != generation
+    score = _engine.score_move(Position.unpack(packed), move, depth, alpha, INFINITY, time_budget)
+    return score, _engine.nodes
+
+
+class ParallelSearch:
+    """
+    Iterative deepening search that shares the root moves of a position out between worker processes.
+    """
+
+    def __init__(self, workers=None, time_budget=3.0, max_depth=64, book=None):
+        """
+        :param workers: int, processes, one per CPU core by default
+        :param book: Book or None
+        """
+        self.book = book
+        self.workers = workers or os.cpu_count() or 1
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.nodes = 0
+        context = multiprocessing.get_context("spawn")
+        self.generation = context.Value("i", 0)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                            initializer=_init_worker, initargs=(self.generation,))
+
+    def search(self, position, time_budget=None, max_depth=None):
+        """
+        Searches for the best move of the side to move, like Engine.search.
+        :param position: Position
+        :param time_budget: float, seconds
+        :param max_depth: int
+        :return: move: tuple or None, score: int, depth: int
+        """
+        time_budget = self.time_budget if time_budget is None else time_budget
+        max_depth = self.max_depth if max_depth is None else max_depth
+        deadline = time.perf_counter() + time_budget
+        self.nodes = 0
+        moves = position.legal_moves()
+        if len(moves) == 0:
+            return None, Engine._terminal_score(position.king_in_check(position.whites_turn), 0), 0
+        if self.book is not None:
+            book_move = self.book.choose(position)
+            if book_move in moves:
+                return book_move, Engine.evaluate(position), 0
+        packed = position.pack()
+        generation = self.generation.value
+        best_move, best_score, completed = moves[0], 0, 0
+        for depth in range(1, max_depth + 1):
+            result = self._search_root(packed, moves, depth, deadline, generation)
+            if result is None:
+                break
+            best_score, best_move = result
+            completed = depth
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if abs(best_score) >= MATE - max_depth - 64:
+                break
+        return best_move, best_score, completed
+
+    def _search_root(self, packed, moves, depth, deadline, generation):
+        # without a completed iteration there is no searched move to return
+        remaining = deadline - time.perf_counter() if depth > 1 else float("inf")
+        if remaining <= 0:
+            return None
+        first, nodes = self.executor.submit(_score_move, packed, moves[0], depth, -INFINITY, remaining,
+                                            generation).result()
+        self.nodes += nodes
+        if first is None:
+            return None
+
+        if depth > 1:
+            remaining = deadline - time.perf_counter()
+        futures = [self.executor.submit(_score_move, packed, move, depth, first, remaining, generation)
+                   for move in moves[1:]]
+        best_score, best_move = first, moves[0]
+        timed_out = False
+        # go through the results in move order, so equal scores are decided like in the serial search
+        for move, future in zip(moves[1:], futures):
+            score, nodes = future.result()
+            self.nodes += nodes
+            if score is None:
+                timed_out = True
+            elif score > best_score:
+                best_score, best_move = score, move
+        if timed_out:
+            return None
+        return best_score, best_move
+
+    def stop(self):
+        """
+        Stops the running searches of all workers.
+        """
+        with self.generation.get_lock():
+            self.generation.value += 1
+
+    def close(self):
+        self.stop()
+        self.executor.shutdown(wait=True, cancel_futures=True)
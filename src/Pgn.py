@@ -0,0 +1,424 @@
+"""
+Reading and writing games in PGN with moves in SAN.
+
+read_games streams a PGN file game by game, only the game being read is held in memory, so files of any size
+can be gone through. Moves are decoded on BitboardPosition: a SAN move names the piece type and the target,
+so only the few pieces of that type that reach the target are tried instead of generating all legal moves.
+
+From the src directory, checks every game of a file and prints the throughput:
+    python Pgn.py games.pgn
+"""
+import re
+import sys
+import time
+
+import Move
+from Bitboard import (BitboardPosition, WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, PIECE_TYPES,
+                      KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, bishop_attacks, rook_attacks, queen_attacks)
+from Position import Position, START_FEN
+
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+SAN_PATTERN = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+TAG_PATTERN = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+# comments, variations, numeric annotations and everything else separated by white space
+TOKEN_PATTERN = re.compile(r"\{[^}]*\}|;[^\n]*|\$\d+|\(|\)|[^\s(){};]+")
+MOVE_NUMBER_PATTERN = re.compile(r"\d+\.+")
+
+
+class PgnGame:
+    """
+    A game as read from PGN: its tags, the moves in SAN and the result.
+    """
+
+    def __init__(self, headers=None, moves=None, result="*"):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []
+        self.result = result
+
+    def start_fen(self):
+        return self.headers.get("FEN", START_FEN)
+
+    def positions(self):
+        """
+        Replays the game and yields the BitboardPosition before every move together with the move.
+        Raises ValueError for a move that is not legal.
+        :return: generator of position: BitboardPosition, move: int
+        """
+        position = BitboardPosition.from_position(Position.from_fen(self.start_fen()))
+        for ply, san in enumerate(self.moves):
+            try:
+                move = san_to_move(position, san)
+            except ValueError as error:
+                raise ValueError("ply {}: {}".format(ply + 1, error)) from None
+            yield position, move
+            position = position.make_move(move)
+
+    def replay(self):
+        """
+        Plays all moves and returns the final position. Raises ValueError for a move that is not legal.
+        :return: BitboardPosition
+        """
+        position = None
+        move = None
+        for position, move in self.positions():
+            pass
+        if position is None:
+            return BitboardPosition.from_position(Position.from_fen(self.start_fen()))
+        return position.make_move(move)
+
+    def to_position(self):
+        """
+        Plays the game on a Position, so its history can be gone through like one played on the board.
+        :return: Position
+        """
+        position = Position.from_fen(self.start_fen())
+        for _, move in self.positions():
+            position.move_piece(*position_move(move))
+            position.whites_turn = not position.whites_turn
+        return position
+
+
+def read_games(file):
+    """
+    Yields the games of a PGN file one at a time.
+    :param file: str, path, or an open text file
+    :return: generator of PgnGame
+    """
+    if isinstance(file, str):
+        with open(file, encoding="utf-8", errors="replace") as opened:
+            yield from read_games(opened)
+        return
+
+    headers = {}
+    movetext = []
+    for line in file:
+        if line.startswith("["):
+            if movetext:
+                yield _parse_game(headers, movetext)
+                headers = {}
+                movetext = []
+            match = TAG_PATTERN.match(line)
+            if match is not None:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+        elif line.startswith("%"):
+            # escaped line, ignored by definition
+            continue
+        elif line.strip():
+            movetext.append(line)
+    if headers or movetext:
+        yield _parse_game(headers, movetext)
+
+
+def _parse_game(headers, movetext):
+    moves = []
+    result = headers.get("Result", "*")
+    depth = 0
+    for token in TOKEN_PATTERN.findall("".join(movetext)):
+        first = token[0]
+        if first == "(":
+            depth += 1
+        elif first == ")":
+            depth -= 1
+        elif depth > 0 or first == "{" or first == ";" or first == "$":
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            # move numbers may be written without a space, like 1.e4
+            san = MOVE_NUMBER_PATTERN.sub("", token, count=1) if first.isdigit() else token
+            if san:
+                moves.append(san)
+    headers.setdefault("Result", result)
+    return PgnGame(headers, moves, result)
+
+
+def san_to_move(position, san):
+    """
+    Finds the legal move a SAN string stands for.
+    :param position: BitboardPosition
+    :param san: str, e.g. "Nbd7", "exd6", "e8=Q+" or "O-O"
+    :return: int, encoded like in the Move module
+    """
+    text = san.rstrip("+#!?")
+    us = WHITE if position.whites_turn else BLACK
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        flag = Move.SHORT_CASTLE if len(text) == 3 else Move.LONG_CASTLE
+        for move in position.legal_moves():
+            if move >> 12 == flag:
+                return move
+        raise ValueError("illegal castling " + san)
+
+    match = SAN_PATTERN.match(text)
+    if match is None:
+        raise ValueError("not a SAN move: " + san)
+    piece_letter, from_file, from_rank, target, promotion = match.groups()
+    to_square = Move.tile_to_square(("abcdefgh".index(target[0]), 8 - int(target[1])))
+    piece_type = PIECE_TYPES.index(piece_letter) if piece_letter else PAWN
+    pieces = position.pieces
+    occupied = position.occupancy[0] | position.occupancy[1]
+    own = pieces[us * 6 + piece_type]
+
+    if piece_type == PAWN:
+        forward = -8 if us == WHITE else 8
+        if from_file is not None and "abcdefgh".index(from_file) != to_square & 7:
+            candidates = PAWN_ATTACKS[us ^ 1][to_square] & own
+        elif occupied >> to_square & 1:
+            # pawns only capture diagonally
+            candidates = 0
+        elif own >> (to_square - forward) & 1:
+            candidates = 1 << (to_square - forward)
+        elif (to_square >> 3 == (4 if us == WHITE else 3) and own >> (to_square - 2 * forward) & 1
+              and not occupied >> (to_square - forward) & 1):
+            candidates = 1 << (to_square - 2 * forward)
+        else:
+            candidates = 0
+    elif piece_type == KNIGHT:
+        candidates = KNIGHT_ATTACKS[to_square] & own
+    elif piece_type == BISHOP:
+        candidates = bishop_attacks(to_square, occupied) & own
+    elif piece_type == ROOK:
+        candidates = rook_attacks(to_square, occupied) & own
+    elif piece_type == QUEEN:
+        candidates = queen_attacks(to_square, occupied) & own
+    else:
+        candidates = KING_ATTACKS[to_square] & own
+
+    found = None
+    while candidates:
+        lowest = candidates & -candidates
+        candidates ^= lowest
+        from_square = lowest.bit_length() - 1
+        if from_file is not None and "abcdefgh".index(from_file) != from_square & 7:
+            continue
+        if from_rank is not None and 8 - int(from_rank) != from_square >> 3:
+            continue
+        move = _encode(position, us, piece_type, from_square, to_square, promotion)
+        if move is not None and _is_legal(position, us, piece_type, move):
+            if found is not None:
+                raise ValueError("ambiguous move " + san)
+            found = move
+    if found is None:
+        raise ValueError("illegal move " + san)
+    return found
+
+
+def _encode(position, us, piece_type, from_square, to_square, promotion):
+    if position.occupancy[us] >> to_square & 1:
+        return None
+    flags = Move.CAPTURE if position.occupancy[us ^ 1] >> to_square & 1 else Move.QUIET
+    if piece_type == PAWN:
+        if to_square == position.ep_square and to_square & 7 != from_square & 7:
+            flags = Move.EN_PASSANT
+        elif to_square & 7 != from_square & 7 and flags != Move.CAPTURE:
+            # a pawn only changes file when it captures
+            return None
+        elif abs(to_square - from_square) == 16:
+            flags = Move.DOUBLE_PAWN_PUSH
+        if to_square >> 3 == (0 if us == WHITE else 7):
+            if promotion is None:
+                return None
+            flags |= Move.PROMOTION | Move.PROMOTION_PIECES.index(promotion)
+        elif promotion is not None:
+            return None
+    elif promotion is not None:
+        return None
+    return Move.encode(from_square, to_square, flags)
+
+
+def _is_legal(position, us, piece_type, move):
+    # the candidates already move like their piece does, what is left is not to leave the own king attacked.
+    # That is checked on the occupancy after the move, without building the position.
+    from_square = move & 63
+    to_square = move >> 6 & 63
+    to_bit = 1 << to_square
+    occupied = (position.occupancy[0] | position.occupancy[1]) ^ (1 << from_square) | to_bit
+    # enemy pieces that are still on the board after the move
+    remaining = ~to_bit
+    if move >> 12 == Move.EN_PASSANT:
+        captured_bit = 1 << (to_square + (8 if us == WHITE else -8))
+        occupied ^= captured_bit
+        remaining &= ~captured_bit
+    pieces = position.pieces
+    enemy_base = (us ^ 1) * 6
+    king_square = to_square if piece_type == KING else pieces[us * 6 + KING].bit_length() - 1
+    queens = pieces[enemy_base + QUEEN]
+    return not (((rook_attacks(king_square, occupied) & (pieces[enemy_base + ROOK] | queens))
+                 | (bishop_attacks(king_square, occupied) & (pieces[enemy_base + BISHOP] | queens))
+                 | (KNIGHT_ATTACKS[king_square] & pieces[enemy_base + KNIGHT])
+                 | (PAWN_ATTACKS[us][king_square] & pieces[enemy_base + PAWN])) & remaining
+                | (KING_ATTACKS[king_square] & pieces[enemy_base + KING]))
+
+
+def move_to_san(position, move):
+    """
+    Returns the SAN string of a legal move, with + or # when it gives check or mate.
+    :param position: BitboardPosition
+    :param move: int
+    :return: str
+    """
+    from_square = move & 63
+    to_square = move >> 6 & 63
+    flags = move >> 12
+    after = position.make_move(move)
+    if after.in_check():
+        suffix = "#" if len(after.legal_moves()) == 0 else "+"
+    else:
+        suffix = ""
+    if flags == Move.SHORT_CASTLE:
+        return "O-O" + suffix
+    if flags == Move.LONG_CASTLE:
+        return "O-O-O" + suffix
+
+    piece_type = position.piece_at(from_square)[1]
+    target = Move.tile_name(Move.square_to_tile(to_square))
+    capture = flags & Move.CAPTURE != 0
+    if piece_type == PAWN:
+        san = ("abcdefgh"[from_square & 7] + "x" if capture else "") + target
+        if flags & Move.PROMOTION:
+            san += "=" + Move.promotion(move)
+        return san + suffix
+
+    # other pieces of the same type that could also go to the target
+    others = [other & 63 for other in position.legal_moves()
+              if other >> 6 & 63 == to_square and other & 63 != from_square
+              and position.piece_at(other & 63)[1] == piece_type]
+    disambiguation = ""
+    if others:
+        if all(other & 7 != from_square & 7 for other in others):
+            disambiguation = "abcdefgh"[from_square & 7]
+        elif all(other >> 3 != from_square >> 3 for other in others):
+            disambiguation = str(8 - (from_square >> 3))
+        else:
+            disambiguation = Move.tile_name(Move.square_to_tile(from_square))
+    return PIECE_TYPES[piece_type] + disambiguation + ("x" if capture else "") + target + suffix
+
+
+def position_move(move):
+    """
+    Converts an encoded move into the tile, target and promotion Position.make_move takes.
+    :param move: int
+    :return: tuple
+    """
+    return Move.to_tiles(move)
+
+
+def encoded_move(position, tile, target, promotion="Q"):
+    """
+    Finds the encoded legal move for the tile, target and promotion format of Position.
+    :param position: BitboardPosition
+    :param tile: tuple
+    :param target: tuple or "short_castle"/"long_castle"
+    :param promotion: str
+    :return: int
+    """
+    from_square = Move.tile_to_square(tile)
+    if target == "short_castle" or target == "long_castle":
+        to_square = from_square + (2 if target == "short_castle" else -2)
+    else:
+        to_square = Move.tile_to_square(target)
+    for move in position.legal_moves():
+        if move & 63 == from_square and move >> 6 & 63 == to_square and (
+                not move >> 12 & Move.PROMOTION or Move.promotion(move) == promotion):
+            return move
+    raise ValueError("illegal move {} {}".format(tile, target))
+
+
+def game_to_pgn(position, headers=None, result=None):
+    """
+    Returns the game played on a Position as PGN.
+    :param position: Position, its whole history is written, also when an earlier ply is shown
+    :param headers: dict, tags to write, the Seven Tag Roster is filled with "?" where missing
+    :param result: str, one of RESULTS, taken from the headers or "*" if omitted
+    :return: str
+    """
+    headers = dict(headers or {})
+    if result is None:
+        result = headers.get("Result", "*")
+    headers["Result"] = result
+    start = position.history.position_at(0)
+    start_fen = start.to_fen()
+    if start_fen != START_FEN:
+        headers["SetUp"] = "1"
+        headers["FEN"] = start_fen
+
+    lines = []
+    for tag in SEVEN_TAG_ROSTER:
+        lines.append('[{} "{}"]'.format(tag, _escape(headers.get(tag, "????.??.??" if tag == "Date" else "?"))))
+    for tag, value in headers.items():
+        if tag not in SEVEN_TAG_ROSTER:
+            lines.append('[{} "{}"]'.format(tag, _escape(value)))
+    lines.append("")
+
+    tokens = []
+    bitboards = BitboardPosition.from_position(start)
+    number = start.fullmove_number
+    # the history stores the moves encoded like the bitboard generator does
+    for ply, move in enumerate(position.history.moves):
+        if bitboards.whites_turn:
+            tokens.append("{}.".format(number))
+        elif ply == 0:
+            tokens.append("{}...".format(number))
+        tokens.append(move_to_san(bitboards, move))
+        bitboards = bitboards.make_move(move)
+        if bitboards.whites_turn:
+            number += 1
+    tokens.append(result)
+
+    # movetext lines stay below 80 characters
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def write_game(file, position, headers=None, result=None):
+    """
+    Appends the game played on a Position to a PGN file.
+    :param file: str, path, or an open text file
+    :param position: Position
+    :param headers: dict
+    :param result: str
+    """
+    text = game_to_pgn(position, headers, result) + "\n"
+    if isinstance(file, str):
+        with open(file, "a", encoding="utf-8") as opened:
+            opened.write(text)
+    else:
+        file.write(text)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python Pgn.py <file.pgn>")
+        return 2
+    games = plies = errors = 0
+    start = time.perf_counter()
+    for game in read_games(argv[0]):
+        games += 1
+        try:
+            for _ in game.positions():
+                plies += 1
+        except ValueError as error:
+            errors += 1
+            print("game {} ({} - {}): {}".format(games, game.headers.get("White", "?"),
+                                                 game.headers.get("Black", "?"), error))
+    seconds = time.perf_counter() - start
+    print("{} games, {} plies, {} with errors in {:.2f} s, {:.0f} games/s".format(
+        games, plies, errors, seconds, games / max(seconds, 1e-9)))
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,34 @@
 class Piece:
-    def __init__(self, color: str, typ: str):
-        self.typ = typ
-        self.color = color
+    """
+    A chess piece. There is only one instance per color and type: Piece("w", "P") always returns the same
+    object, so boards, history snapshots and caches share the twelve pieces instead of allocating new ones.
+    Pieces are immutable, a promotion puts a different piece on the tile.
+    """
+    __slots__ = ("color", "typ", "white", "image_name", "index")
+    _pieces = {}
 
-    def get_image_name(self):
-        return self.color + self.typ
+    def __new__(cls, color: str, typ: str):
+        piece = cls._pieces.get((color, typ))
+        if piece is None:
+            piece = super().__new__(cls)
+            piece.color = color
+            piece.typ = typ
+            piece.white = color == "w"
+            piece.image_name = color + typ
+            # 0-5 for the white pieces in PNBRQK order, 6-11 for the black ones
+            piece.index = "PNBRQK".index(typ) + (0 if piece.white else 6)
+            cls._pieces[(color, typ)] = piece
+        return piece
 
-    def is_white(self):
-        return self.color == "w"
+    def __reduce__(self):
+        # unpickling goes through __new__ again and gets the shared instance of the receiving process
+        return Piece, (self.color, self.typ)
 
+    def __repr__(self):
+        return "Piece({!r}, {!r})".format(self.color, self.typ)
 
+    def get_image_name(self):
+        return self.image_name
+
+    def is_white(self):
+        return self.white
@@ -0,0 +1,900 @@
+import numpy as np
+import Evaluation
+import Move
+import Zobrist
+from History import History
+from Piece import Piece
+
+ROOK_DIRECTIONS = ((0, -1), (0, 1), (1, 0), (-1, 0))
+BISHOP_DIRECTIONS = ((-1, -1), (1, 1), (1, -1), (-1, 1))
+KNIGHT_OFFSETS = ((1, -2), (-1, -2), (1, 2), (-1, 2), (2, -1), (2, 1), (-2, -1), (-2, 1))
+KING_OFFSETS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+def _targets(offsets):
+    table = []
+    for square in range(64):
+        x, y = square & 7, square >> 3
+        table.append(tuple((x + dx, y + dy) for dx, dy in offsets if 0 <= x + dx < 8 and 0 <= y + dy < 8))
+    return table
+
+
+def _rays(dx, dy):
+    table = []
+    for square in range(64):
+        ray = []
+        x, y = (square & 7) + dx, (square >> 3) + dy
+        while 0 <= x < 8 and 0 <= y < 8:
+            ray.append((x, y))
+            x += dx
+            y += dy
+        table.append(tuple(ray))
+    return table
+
+
+# lookup tables indexed by y * 8 + x of a tile, built once at import so the generators need no bounds checks
+KNIGHT_TARGETS = _targets(KNIGHT_OFFSETS)
+KING_TARGETS = _targets(KING_OFFSETS)
+# tiles a white (index 0) or black (index 1) pawn captures on
+PAWN_CAPTURES = (_targets(((-1, -1), (1, -1))), _targets(((-1, 1), (1, 1))))
+# per direction the tiles from next to the square to the edge of the board, in order
+RAYS = {direction: _rays(*direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+ROOK_RAYS = [tuple(RAYS[direction][square] for direction in ROOK_DIRECTIONS) for square in range(64)]
+BISHOP_RAYS = [tuple(RAYS[direction][square] for direction in BISHOP_DIRECTIONS) for square in range(64)]
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+# castling rights, as letters like in FEN, that are lost once something moves from or to a tile
+CASTLING_LOST = {(4, 7): "KQ", (7, 7): "K", (0, 7): "Q", (4, 0): "kq", (7, 0): "k", (0, 0): "q"}
+# what a character of a FEN piece placement stands for
+FEN_CELLS = {char: [Piece("w" if char.isupper() else "b", char.upper())] for char in "PNBRQKpnbrqk"}
+FEN_CELLS.update({str(count): ["-"] * count for count in range(1, 9)})
+# results of game_result, the game goes on while it returns None
+CHECKMATE, STALEMATE, INSUFFICIENT_MATERIAL = "checkmate", "stalemate", "insufficient material"
+
+
+class Position:
+    """
+    Headless chess position and rules.
+
+    Holds the pieces, the side to move and the move log and generates moves for them. Nothing in here
+    imports pygame, so move generation, check and checkmate detection can run without a display or mixer.
+    """
+    DIMENSION = 8
+
+    def __init__(self, board=None):
+        """
+        :param board: 8x8 array of Piece and "-", the starting position if omitted
+        """
+        self.checks = []
+        self.undo_stack = []
+        self.whites_turn = True
+        self.in_check = False
+        self.castling = "KQkq"
+        self.ep_tile = None
+        # plies since the last capture or pawn move and the number of the current full move, like in FEN
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.board = board if board is not None else np.array([
+            [Piece("b", "R"), Piece("b", "N"), Piece("b", "B"), Piece("b", "Q"), Piece("b", "K"), Piece("b", "B"),
+             Piece("b", "N"), Piece("b", "R")],
+            [Piece("b", "P"), Piece("b", "P"), Piece("b", "P"), Piece("b", "P"), Piece("b", "P"), Piece("b", "P"),
+             Piece("b", "P"), Piece("b", "P")],
+            ["-", "-", "-", "-", "-", "-", "-", "-"],
+            ["-", "-", "-", "-", "-", "-", "-", "-"],
+            ["-", "-", "-", "-", "-", "-", "-", "-"],
+            ["-", "-", "-", "-", "-", "-", "-", "-"],
+            [Piece("w", "P"), Piece("w", "P"), Piece("w", "P"), Piece("w", "P"), Piece("w", "P"), Piece("w", "P"),
+             Piece("w", "P"), Piece("w", "P")],
+            [Piece("w", "R"), Piece("w", "N"), Piece("w", "B"), Piece("w", "Q"), Piece("w", "K"), Piece("w", "B"),
+             Piece("w", "N"), Piece("w", "R")]
+        ])
+        # Zobrist key of pieces, castling rights and en passant tile, kept up to date by every move. Callers that
+        # pass a board set it themselves once they know the castling rights and en passant tile.
+        self.key = Zobrist.board_key(self.board, self.castling, self.ep_tile) if board is None else 0
+        # middlegame and endgame piece-square sums and game phase of Evaluation, kept up to date like the key
+        self.mg, self.eg, self.phase = Evaluation.board_scores(self.board) if board is None else (0, 0, 0)
+        # created on first use, so positions that are never played on like FEN batches or search copies skip it
+        self._history = None
+        # the ply shown, len(self.history) unless going through the history
+        self.ply = 0
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Creates a position from a FEN string. The fields after the placement are optional.
+        :param fen: str
+        :return: Position
+        :raises ValueError: for a field that can't be read
+        """
+        fields = fen.split()
+        if len(fields) == 0:
+            raise ValueError("empty FEN")
+        cells = []
+        try:
+            for row in fields[0].split("/"):
+                row_cells = [cell for char in row for cell in FEN_CELLS[char]]
+                if len(row_cells) != cls.DIMENSION:
+                    raise KeyError(row)
+                cells += row_cells
+        except KeyError:
+            raise ValueError("invalid FEN placement: " + fields[0])
+        if len(cells) != 64:
+            raise ValueError("invalid FEN placement: " + fields[0])
+        # the move generation needs both kings and can't move pawns off the board
+        if fields[0].count("K") != 1 or fields[0].count("k") != 1:
+            raise ValueError("FEN needs one king per side: " + fields[0])
+        if any(cell != "-" and cell.typ == "P" for cell in cells[:8] + cells[56:]):
+            raise ValueError("FEN has pawns on the first or last rank: " + fields[0])
+        board = np.empty(64, dtype=object)
+        board[:] = cells
+        position = cls(board.reshape(cls.DIMENSION, cls.DIMENSION))
+        if len(fields) > 1 and fields[1] not in ("w", "b"):
+            raise ValueError("invalid FEN side to move: " + fields[1])
+        position.whites_turn = len(fields) < 2 or fields[1] == "w"
+        castling = fields[2] if len(fields) > 2 and fields[2] != "-" else ""
+        if len(castling) != len(set(castling)) or not set(castling) <= set("KQkq"):
+            raise ValueError("invalid FEN castling rights: " + castling)
+        position.castling = castling
+        if len(fields) > 3 and fields[3] != "-":
+            if len(fields[3]) != 2 or fields[3][0] not in "abcdefgh" or fields[3][1] not in "36":
+                raise ValueError("invalid FEN en passant square: " + fields[3])
+            position.ep_tile = ("abcdefgh".index(fields[3][0]), 8 - int(fields[3][1]))
+        if len(fields) > 4:
+            position.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            position.fullmove_number = int(fields[5])
+        position.key = Zobrist.board_key(position.board, position.castling, position.ep_tile)
+        position.mg, position.eg, position.phase = Evaluation.board_scores(position.board)
+        return position
+
+    def to_fen(self):
+        """
+        Returns the position as a FEN string.
+        :return: str
+        """
+        rows = []
+        for y in range(self.DIMENSION):
+            row = ""
+            empty = 0
+            for piece in self.board[y]:
+                if piece == "-":
+                    empty += 1
+                    continue
+                if empty > 0:
+                    row += str(empty)
+                    empty = 0
+                row += piece.typ if piece.white else piece.typ.lower()
+            if empty > 0:
+                row += str(empty)
+            rows.append(row)
+        ep = "-" if self.ep_tile is None else "abcdefgh"[self.ep_tile[0]] + str(8 - self.ep_tile[1])
+        return "{} {} {} {} {} {}".format("/".join(rows), "w" if self.whites_turn else "b", self.castling or "-",
+                                          ep, self.halfmove_clock, self.fullmove_number)
+
+    def pack(self):
+        """
+        Returns the position as 67 bytes that are cheap to pickle and send to other processes: one letter per
+        tile like in FEN, "." for empty tiles, then side to move, castling rights as bits in KQkq order and the
+        en passant tile, 255 if there is none. The move log is not included.
+        :return: bytes
+        """
+        cells = bytearray(b"." * 64)
+        for y in range(self.DIMENSION):
+            for x in range(self.DIMENSION):
+                piece = self.board[y, x]
+                if piece != "-":
+                    cells[y * 8 + x] = ord(piece.typ if piece.white else piece.typ.lower())
+        castling = 0
+        for bit, right in enumerate("KQkq"):
+            if right in self.castling:
+                castling |= 1 << bit
+        ep = 255 if self.ep_tile is None else self.ep_tile[1] * 8 + self.ep_tile[0]
+        return bytes(cells) + bytes((1 if self.whites_turn else 0, castling, ep))
+
+    @classmethod
+    def unpack(cls, data):
+        """
+        Creates a position from the output of pack.
+        :param data: bytes
+        :return: Position
+        """
+        position = cls(np.full((cls.DIMENSION, cls.DIMENSION), "-", dtype=object))
+        for index in range(64):
+            char = chr(data[index])
+            if char != ".":
+                position.board[index >> 3, index & 7] = Piece("w" if char.isupper() else "b", char.upper())
+        position.whites_turn = data[64] == 1
+        position.castling = "".join(right for bit, right in enumerate("KQkq") if data[65] >> bit & 1)
+        position.ep_tile = None if data[66] == 255 else (data[66] & 7, data[66] >> 3)
+        position.key = Zobrist.board_key(position.board, position.castling, position.ep_tile)
+        position.mg, position.eg, position.phase = Evaluation.board_scores(position.board)
+        return position
+
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = History(self)
+        return self._history
+
+    def zobrist_key(self):
+        """
+        Returns the 64 bit Zobrist key of the position including the side to move.
+        :return: int
+        """
+        if self.whites_turn:
+            return self.key
+        return self.key ^ Zobrist.SIDE_KEY
+
+    def move_piece(self, tile1, tile2, promotion="Q"):
+        """
+        Moves piece from one tile to another and adds the move to the history.
+        :param tile1: tuple
+        :param tile2: tuple
+        :param promotion: str, type a pawn reaching the last row turns into
+        """
+        history = self.history
+        move = self.encode_move(tile1, tile2, promotion)
+        if isinstance(tile2, str):
+            self.halfmove_clock += 1
+        elif self.board[tile2[1], tile2[0]] != "-" or self.board[tile1[1], tile1[0]].typ == "P":
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if not self.whites_turn:
+            self.fullmove_number += 1
+
+        if tile2 == "short_castle":
+            self.short_castle(tile1)
+        elif tile2 == "long_castle":
+            self.long_castle(tile1)
+        else:
+            self._move(tile1, tile2, promotion)
+        history.record(self, move)
+        self.ply = len(history)
+
+    @property
+    def moveLog(self):
+        """
+        The moves of the game as 16 bit integers of the Move module, two bytes per ply.
+        :return: array
+        """
+        return self.history.moves
+
+    def encode_move(self, tile1, tile2, promotion="Q"):
+        """
+        Encodes a move that is about to be played with the flags of the Move module, the same integer the
+        BitboardPosition generates for it.
+        :param tile1: tuple
+        :param tile2: tuple or "short_castle"/"long_castle"
+        :param promotion: str
+        :return: int
+        """
+        from_square = tile1[1] * 8 + tile1[0]
+        if tile2 == "short_castle":
+            return Move.encode(from_square, from_square + 2, Move.SHORT_CASTLE)
+        if tile2 == "long_castle":
+            return Move.encode(from_square, from_square - 2, Move.LONG_CASTLE)
+        flags = Move.QUIET if self.board[tile2[1], tile2[0]] == "-" else Move.CAPTURE
+        if self.board[tile1[1], tile1[0]].typ == "P":
+            if tile2[1] == 0 or tile2[1] == 7:
+                flags |= Move.PROMOTION | Move.PROMOTION_PIECES.index(promotion)
+            elif tile2 == self.ep_tile:
+                flags = Move.EN_PASSANT
+            elif abs(tile2[1] - tile1[1]) == 2:
+                flags = Move.DOUBLE_PAWN_PUSH
+        return Move.encode(from_square, tile2[1] * 8 + tile2[0], flags)
+
+    def make_move(self, tile1, tile2, promotion="Q"):
+        """
+        Plays a move so that unmake_move can take it back, without touching the move log. Only the moved and
+        captured piece and the castling and en passant state are stored on the undo stack. Switches the side
+        to move.
+        :param tile1: tuple
+        :param tile2: tuple or "short_castle"/"long_castle"
+        :param promotion: str, type a pawn reaching the last row turns into
+        """
+        if tile2 == "short_castle":
+            undo = self._castle_pieces(tile1, 2, 3, 1)
+        elif tile2 == "long_castle":
+            undo = self._castle_pieces(tile1, -2, -4, -1)
+        else:
+            undo = self._move(tile1, tile2, promotion)
+        self.undo_stack.append(undo)
+        self.whites_turn = not self.whites_turn
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move.
+        """
+        (tile1, tile2, piece, captured, captured_tile, self.castling, self.ep_tile, self.key, self.mg, self.eg,
+         self.phase) = self.undo_stack.pop()
+        self.whites_turn = not self.whites_turn
+        if tile2 == "short_castle" or tile2 == "long_castle":
+            # castling stores the previous content of the king and rook rows
+            y = tile1[1]
+            for x, old in captured:
+                self.board[y, x] = old
+        else:
+            self.board[tile1[1], tile1[0]] = piece
+            self.board[tile2[1], tile2[0]] = "-"
+            self.board[captured_tile[1], captured_tile[0]] = captured
+
+    def _move(self, tile1, tile2, promotion):
+        """
+        Moves a piece including en passant captures and promotions and updates castling rights and the en
+        passant tile.
+        :return: tuple, what unmake_move needs to restore the position
+        """
+        piece = self.board[tile1[1], tile1[0]]
+        captured_tile = tile2
+        if piece.typ == "P" and tile2 == self.ep_tile:
+            captured_tile = (tile2[0], tile1[1])
+        captured = self.board[captured_tile[1], captured_tile[0]]
+        undo = (tile1, tile2, piece, captured, captured_tile, self.castling, self.ep_tile, self.key, self.mg,
+                self.eg, self.phase)
+
+        key = self.key ^ Zobrist.piece_key(piece, tile1)
+        mg, eg = Evaluation.SCORES[piece.index][tile1[1] * 8 + tile1[0]]
+        mg, eg = self.mg - mg, self.eg - eg
+        if captured != "-":
+            key ^= Zobrist.piece_key(captured, captured_tile)
+            captured_mg, captured_eg = Evaluation.SCORES[captured.index][captured_tile[1] * 8 + captured_tile[0]]
+            mg -= captured_mg
+            eg -= captured_eg
+            self.phase -= Evaluation.PHASE_WEIGHTS[captured.typ]
+        self.board[captured_tile[1], captured_tile[0]] = "-"
+        self.board[tile2[1], tile2[0]] = piece
+        self.board[tile1[1], tile1[0]] = "-"
+        if self.ep_tile is not None:
+            key ^= Zobrist.EP_KEYS[self.ep_tile[0]]
+            self.ep_tile = None
+        if piece.typ == "P":
+            if tile2[1] == 0 or tile2[1] == 7:
+                piece = self.board[tile2[1], tile2[0]] = Piece(piece.color, promotion)
+                self.phase += Evaluation.PHASE_WEIGHTS[promotion]
+            elif abs(tile2[1] - tile1[1]) == 2:
+                self.ep_tile = (tile1[0], (tile1[1] + tile2[1]) // 2)
+                key ^= Zobrist.EP_KEYS[tile1[0]]
+        key ^= Zobrist.piece_key(piece, tile2)
+        piece_mg, piece_eg = Evaluation.SCORES[piece.index][tile2[1] * 8 + tile2[0]]
+        self.mg = mg + piece_mg
+        self.eg = eg + piece_eg
+        if self.castling:
+            for tile in (tile1, tile2):
+                for right in CASTLING_LOST.get(tile, ""):
+                    if right in self.castling:
+                        self.castling = self.castling.replace(right, "")
+                        key ^= Zobrist.CASTLING_KEYS[right]
+        self.key = key
+        return undo
+
+    def _castle_pieces(self, tile, king_step, rook_start, rook_step):
+        x, y = tile
+        undo = (tile, "short_castle" if king_step > 0 else "long_castle", None,
+                [(col, self.board[y, col]) for col in (x, x + king_step, x + rook_start, x + rook_step)], None,
+                self.castling, self.ep_tile, self.key, self.mg, self.eg, self.phase)
+        king = self.board[y, x]
+        rook = self.board[y, x + rook_start]
+        self.board[y, x + king_step] = king
+        self.board[y, x] = "-"
+        self.board[y, x + rook_step] = rook
+        self.board[y, x + rook_start] = "-"
+        key = self.key ^ Zobrist.piece_key(king, tile) ^ Zobrist.piece_key(king, (x + king_step, y))
+        key ^= Zobrist.piece_key(rook, (x + rook_start, y)) ^ Zobrist.piece_key(rook, (x + rook_step, y))
+        king_scores = Evaluation.SCORES[king.index]
+        rook_scores = Evaluation.SCORES[rook.index]
+        for scores, start, end in ((king_scores, x, x + king_step), (rook_scores, x + rook_start, x + rook_step)):
+            self.mg += scores[y * 8 + end][0] - scores[y * 8 + start][0]
+            self.eg += scores[y * 8 + end][1] - scores[y * 8 + start][1]
+        if self.ep_tile is not None:
+            key ^= Zobrist.EP_KEYS[self.ep_tile[0]]
+            self.ep_tile = None
+        for right in CASTLING_LOST[(4, 7) if king.white else (4, 0)]:
+            if right in self.castling:
+                self.castling = self.castling.replace(right, "")
+                key ^= Zobrist.CASTLING_KEYS[right]
+        self.key = key
+        return undo
+
+    def can_move(self):
+        return self.ply == len(self.history)
+
+    def go_to_ply(self, ply):
+        """
+        Shows the position after a number of plies of the game, the board can only be moved on at the last one.
+        :param ply: int, clamped to the plies played
+        :return: bool, whether the position changed
+        """
+        ply = max(0, min(ply, len(self.history)))
+        if ply == self.ply:
+            return False
+        position = self.history.position_at(ply)
+        self.board = position.board
+        self.whites_turn = position.whites_turn
+        self.castling = position.castling
+        self.ep_tile = position.ep_tile
+        self.key = position.key
+        self.mg, self.eg, self.phase = position.mg, position.eg, position.phase
+        self.halfmove_clock = position.halfmove_clock
+        self.fullmove_number = position.fullmove_number
+        self.ply = ply
+        self.in_check = False
+        self.check_for_checks()
+        return True
+
+    def undo_move(self):
+        """
+        Goes back to the position before the last ply shown.
+        :return: bool, whether a move was undone
+        """
+        return self.go_to_ply(self.ply - 1)
+
+    def move_forward(self):
+        """
+        Goes to the next ply that was played.
+        :return: bool, whether a move was replayed
+        """
+        return self.go_to_ply(self.ply + 1)
+
+    def go_to_start(self):
+        return self.go_to_ply(0)
+
+    def go_to_end(self):
+        return self.go_to_ply(len(self.history))
+
+    def get_all_possible_moves(self, tile):
+        """
+        Returns all move a particular piece can perform on a certain tile.
+        :param tile: tuple
+        :return: list(tuple)
+        """
+        piece: Piece = self.board[tile[1], tile[0]]
+
+        if piece.typ == "P":
+            return self.check_pawn_moves(tile)
+
+        # rooks
+        if piece.typ == "R":
+            moves = []
+            # upwards
+            moves.extend(self.check_above_line(tile))
+            # downwards
+            moves.extend(self.check_below_line(tile))
+            # right
+            moves.extend(self.check_right_line(tile))
+            # left
+            moves.extend(self.check_left_line(tile))
+
+            return moves
+
+        # bishops
+        if piece.typ == "B":
+            moves = []
+            # check left right diagonal
+            moves.extend(self.check_upper_left_right_diagonal(tile))
+            moves.extend(self.check_lower_left_right_diagonal(tile))
+            # check right left diagonal
+            moves.extend(self.check_upper_right_left_diagonal(tile))
+            moves.extend(self.check_lower_right_left_diagonal(tile))
+
+            return moves
+
+        # queens
+        if piece.typ == "Q":
+            moves = []
+            # check left right diagonal
+            moves.extend(self.check_upper_left_right_diagonal(tile))
+            moves.extend(self.check_lower_left_right_diagonal(tile))
+            # check right left diagonal
+            moves.extend(self.check_upper_right_left_diagonal(tile))
+            moves.extend(self.check_lower_right_left_diagonal(tile))
+            # upwards
+            moves.extend(self.check_above_line(tile))
+            # downwards
+            moves.extend(self.check_below_line(tile))
+            # right
+            moves.extend(self.check_right_line(tile))
+            # left
+            moves.extend(self.check_left_line(tile))
+            return moves
+
+        # kings
+        if piece.typ == "K":
+            return self.check_king_moves(tile)
+
+        # knights
+        if piece.typ == "N":
+            return self.check_knight_moves(tile)
+
+    # all methods that check possible moves in a particular shape
+    def check_above_line(self, tile):
+        return self._check_ray(tile, RAYS[(0, -1)][tile[1] * 8 + tile[0]])
+
+    def check_below_line(self, tile):
+        return self._check_ray(tile, RAYS[(0, 1)][tile[1] * 8 + tile[0]])
+
+    def check_right_line(self, tile):
+        return self._check_ray(tile, RAYS[(1, 0)][tile[1] * 8 + tile[0]])
+
+    def check_left_line(self, tile):
+        return self._check_ray(tile, RAYS[(-1, 0)][tile[1] * 8 + tile[0]])
+
+    def check_upper_left_right_diagonal(self, tile):
+        return self._check_ray(tile, RAYS[(-1, -1)][tile[1] * 8 + tile[0]])
+
+    def check_lower_left_right_diagonal(self, tile):
+        return self._check_ray(tile, RAYS[(1, 1)][tile[1] * 8 + tile[0]])
+
+    def check_upper_right_left_diagonal(self, tile):
+        return self._check_ray(tile, RAYS[(1, -1)][tile[1] * 8 + tile[0]])
+
+    def check_lower_right_left_diagonal(self, tile):
+        return self._check_ray(tile, RAYS[(-1, 1)][tile[1] * 8 + tile[0]])
+
+    def _check_ray(self, tile, ray):
+        """
+        Collects the tiles along a ray up to and including the first enemy piece, a king there is a check.
+        :param tile: tuple
+        :param ray: tuple of tiles from RAYS
+        :return: list(tuple)
+        """
+        board = self.board
+        white = board[tile[1], tile[0]].white
+        moves = []
+        for target in ray:
+            piece = board[target[1], target[0]]
+            if piece == "-":
+                moves.append(target)
+                continue
+            if piece.white != white:
+                if piece.typ == "K":
+                    self.checks.append((tile, target))
+                else:
+                    moves.append(target)
+            break
+        return moves
+
+    def check_king_moves(self, tile):
+        moves = []
+        og_piece = self.board[tile[1], tile[0]]
+        for target in KING_TARGETS[tile[1] * 8 + tile[0]]:
+            piece = self.board[target[1], target[0]]
+            if piece == "-" or (piece.white != og_piece.white and piece.typ != "K"):
+                moves.append(target)
+
+        # castling only exists for a king on its starting tile
+        if tile != (4, 7 if og_piece.white else 0):
+            return moves
+
+        if self.check_short_castle(og_piece.white):
+            moves.append("short_castle")
+
+        if self.check_long_castle(og_piece.white):
+            moves.append("long_castle")
+
+        return moves
+
+    def check_short_castle(self, white):
+        row, right = (7, "K") if white else (0, "k")
+        return right in self.castling and self.board[row, 5] == "-" and self.board[row, 6] == "-" and isinstance(
+            self.board[row, 7], Piece) and self.board[row, 7].image_name == ("wR" if white else "bR")
+
+    def check_long_castle(self, white):
+        row, right = (7, "Q") if white else (0, "q")
+        return right in self.castling and self.board[row, 3] == "-" and self.board[row, 2] == "-" and self.board[
+            row, 1] == "-" and isinstance(self.board[row, 0], Piece) and self.board[row, 0].image_name == (
+                   "wR" if white else "bR")
+
+    def short_castle(self, tile):
+        self._move(tile, (tile[0] + 2, tile[1]), "Q")
+        self._move((tile[0] + 3, tile[1]), (tile[0] + 1, tile[1]), "Q")
+
+    def long_castle(self, tile):
+        self._move(tile, (tile[0] - 2, tile[1]), "Q")
+        self._move((tile[0] - 4, tile[1]), (tile[0] - 1, tile[1]), "Q")
+
+    def check_knight_moves(self, tile):
+        moves = []
+        og_piece = self.board[tile[1], tile[0]]
+        for target in KNIGHT_TARGETS[tile[1] * 8 + tile[0]]:
+            piece = self.board[target[1], target[0]]
+            if piece == "-":
+                moves.append(target)
+            elif piece.white != og_piece.white:
+                if piece.typ == "K":
+                    self.checks.append((tile, target))
+                else:
+                    moves.append(target)
+        return moves
+
+    def check_pawn_moves(self, tile):
+        piece: Piece = self.board[tile[1], tile[0]]
+        x, y = tile
+        # white pawns move towards y = 0 and start on row 6, black pawns the other way round
+        step, start_row = (-1, 6) if piece.white else (1, 1)
+
+        moves = []
+        # check free space, a pawn never stands on the last row so the tile ahead is on the board
+        if self.board[y + step, x] == "-":
+            moves.append((x, y + step))
+            # move 2 from the starting row
+            if y == start_row and self.board[y + 2 * step, x] == "-":
+                moves.append((x, y + 2 * step))
+        # check captures
+        for target in PAWN_CAPTURES[0 if piece.white else 1][y * 8 + x]:
+            other = self.board[target[1], target[0]]
+            if other != "-" and other.white != piece.white:
+                if other.typ == "K":
+                    self.checks.append((tile, target))
+                else:
+                    moves.append(target)
+            # en passant
+            elif target == self.ep_tile:
+                moves.append(target)
+
+        return moves
+
+    def find_king(self, white):
+        """
+        Returns the tile of the king of one color.
+        :param white: bool
+        :return: tuple
+        """
+        for y in range(self.DIMENSION):
+            for x in range(self.DIMENSION):
+                piece = self.board[y, x]
+                if isinstance(piece, Piece) and piece.typ == "K" and piece.white == white:
+                    return x, y
+        return None
+
+    def is_attacked(self, tile, by_white):
+        """
+        Checks whether any piece of one color attacks a tile, looking outwards from the tile instead of
+        generating the moves of every piece.
+        :param tile: tuple
+        :param by_white: bool
+        :return: bool
+        """
+        board = self.board
+        square = tile[1] * 8 + tile[0]
+        for rays, sliders in ((ROOK_RAYS[square], "RQ"), (BISHOP_RAYS[square], "BQ")):
+            for ray in rays:
+                for x, y in ray:
+                    piece = board[y, x]
+                    if piece != "-":
+                        if piece.white == by_white and piece.typ in sliders:
+                            return True
+                        break
+        for targets, typ in ((KNIGHT_TARGETS[square], "N"), (KING_TARGETS[square], "K"),
+                             # white pawns attack the tile from where a black pawn on it would capture
+                             (PAWN_CAPTURES[1 if by_white else 0][square], "P")):
+            for x, y in targets:
+                piece = board[y, x]
+                if piece != "-" and piece.white == by_white and piece.typ == typ:
+                    return True
+        return False
+
+    def king_in_check(self, white):
+        """
+        Checks whether the king of one color is attacked.
+        :param white: bool
+        :return: bool
+        """
+        king = self.find_king(white)
+        return king is not None and self.is_attacked(king, not white)
+
+    def check_for_checks(self):
+        """
+        Collects all checks on the board in self.checks and sets in_check if there is one.
+        """
+        self.checks = []
+        for white in (True, False):
+            king, checkers, _, _ = self.checks_and_pins(white)
+            for checker in checkers:
+                self.checks.append((checker, king))
+        if len(self.checks) > 0:
+            self.in_check = True
+
+    def checks_and_pins(self, white):
+        """
+        Looks outwards from the king of one color once and finds the pieces giving check, the tiles a non king
+        move has to land on to answer the check and the pinned pieces with the tiles they can still move to.
+        :param white: bool
+        :return: king: tuple, checkers: list(tuple), evasions: set or None when not in check,
+            pins: dict(tuple, set)
+        """
+        king = self.find_king(white)
+        board = self.board
+        square = king[1] * 8 + king[0]
+        checkers = []
+        evasions = set()
+        pins = {}
+        for rays, sliders in ((ROOK_RAYS[square], "RQ"), (BISHOP_RAYS[square], "BQ")):
+            for ray in rays:
+                pinned = None
+                for index, (x, y) in enumerate(ray):
+                    piece = board[y, x]
+                    if piece == "-":
+                        continue
+                    if piece.white == white:
+                        if pinned is not None:
+                            break
+                        pinned = (x, y)
+                    else:
+                        if piece.typ in sliders:
+                            if pinned is None:
+                                checkers.append((x, y))
+                                evasions.update(ray[:index + 1])
+                            else:
+                                pins[pinned] = set(ray[:index + 1])
+                        break
+        # a king is checked by enemy pawns standing where its own pawn would capture
+        for targets, typ in ((KNIGHT_TARGETS[square], "N"), (PAWN_CAPTURES[0 if white else 1][square], "P")):
+            for x, y in targets:
+                piece = board[y, x]
+                if piece != "-" and piece.white != white and piece.typ == typ:
+                    checkers.append((x, y))
+                    evasions.add((x, y))
+        if len(checkers) == 0:
+            evasions = None
+        elif len(checkers) > 1:
+            evasions = set()
+        return king, checkers, evasions, pins
+
+    def get_legal_moves(self, tile):
+        """
+        Returns the legal moves of the piece on a tile.
+        :param tile: tuple
+        :return: list
+        """
+        piece = self.board[tile[1], tile[0]]
+        return self._legal_moves_of(tile, piece, *self.checks_and_pins(piece.white))
+
+    def get_all_legal_moves(self, white=None):
+        """
+        Returns all legal moves of one color, by default of the side to move.
+        :param white: bool
+        :return: list(tuple), pairs of tile and move
+        """
+        if white is None:
+            white = self.whites_turn
+        checks = self.checks
+        masks = self.checks_and_pins(white)
+        moves = []
+        for square, piece in enumerate(self.board.flat):
+            if piece != "-" and piece.white == white:
+                tile = (square & 7, square >> 3)
+                for move in self._legal_moves_of(tile, piece, *masks):
+                    moves.append((tile, move))
+        self.checks = checks
+        return moves
+
+    def legal_moves(self):
+        """
+        Returns the legal moves of the side to move as arguments for make_move, with one move per promotion
+        piece.
+        :return: list(tuple), tile, target and promotion type
+        """
+        moves = []
+        for tile, target in self.get_all_legal_moves():
+            if self.board[tile[1], tile[0]].typ == "P" and (target[1] == 0 or target[1] == 7):
+                for promotion in "QRBN":
+                    moves.append((tile, target, promotion))
+            else:
+                moves.append((tile, target, "Q"))
+        return moves
+
+    def _legal_moves_of(self, tile, piece, king, checkers, evasions, pins):
+        moves = self.get_all_possible_moves(tile)
+        if piece.typ == "K":
+            return self._legal_king_moves(tile, piece, moves, checkers)
+        en_passant = piece.typ == "P" and self.ep_tile in moves
+        if evasions is not None:
+            moves = [move for move in moves if move in evasions]
+        if tile in pins:
+            moves = [move for move in moves if move in pins[tile]]
+        # en passant takes two pieces off a line at once, which the masks can't see, so it is tried out
+        if en_passant:
+            ep_tile = self.ep_tile
+            if ep_tile in moves:
+                moves.remove(ep_tile)
+            self.make_move(tile, ep_tile)
+            if not self.king_in_check(piece.white):
+                moves.append(ep_tile)
+            self.unmake_move()
+        return moves
+
+    def _legal_king_moves(self, tile, piece, moves, checkers):
+        x, y = tile
+        by_white = not piece.white
+        legal = []
+        # take the king off the board so squares behind it on a checking line count as attacked
+        self.board[y, x] = "-"
+        for move in moves:
+            if move == "short_castle":
+                if len(checkers) == 0 and self._can_castle(tile, piece, 3, (1, 2), (1, 2)):
+                    legal.append(move)
+            elif move == "long_castle":
+                if len(checkers) == 0 and self._can_castle(tile, piece, -4, (-1, -2, -3), (-1, -2)):
+                    legal.append(move)
+            elif not self.is_attacked(move, by_white):
+                legal.append(move)
+        self.board[y, x] = piece
+        return legal
+
+    def _can_castle(self, tile, king, rook_offset, empty_offsets, passed_offsets):
+        x, y = tile
+        rook = self.board[y, x + rook_offset]
+        if not isinstance(rook, Piece) or rook.typ != "R" or rook.white != king.white:
+            return False
+        for offset in empty_offsets:
+            if self.board[y, x + offset] != "-":
+                return False
+        for offset in passed_offsets:
+            if self.is_attacked((x + offset, y), not king.white):
+                return False
+        return True
+
+    def has_legal_move(self, white=None):
+        """
+        Checks whether one color, by default the side to move, has any legal move, stopping at the first one
+        found. King steps are tried first, then the other pieces, which in check only keep the moves that
+        capture the checker or block its line. Castling is never needed: when it is legal, so is the king's
+        step onto the tile next to it.
+        :param white: bool
+        :return: bool
+        """
+        if white is None:
+            white = self.whites_turn
+        checks = self.checks
+        try:
+            king, checkers, evasions, pins = self.checks_and_pins(white)
+            x, y = king
+            king_piece = self.board[y, x]
+            self.board[y, x] = "-"
+            try:
+                for target in KING_TARGETS[y * 8 + x]:
+                    piece = self.board[target[1], target[0]]
+                    if (piece == "-" or piece.white != white) and not self.is_attacked(target, not white):
+                        return True
+            finally:
+                self.board[y, x] = king_piece
+            # in double check only the king can move
+            if len(checkers) > 1:
+                return False
+            for index, piece in enumerate(self.board.flat):
+                if piece != "-" and piece.white == white and piece.typ != "K":
+                    tile = (index & 7, index >> 3)
+                    if self._legal_moves_of(tile, piece, king, checkers, evasions, pins):
+                        return True
+            return False
+        finally:
+            self.checks = checks
+
+    def insufficient_material(self):
+        """
+        Checks whether neither side can ever mate: only kings, a single knight or bishop, or bishops that all
+        stand on tiles of one color.
+        :return: bool
+        """
+        minors = []
+        for index, piece in enumerate(self.board.flat):
+            if piece == "-" or piece.typ == "K":
+                continue
+            if piece.typ in "PRQ":
+                return False
+            minors.append((piece.typ, ((index & 7) + (index >> 3)) % 2))
+        if len(minors) <= 1:
+            return True
+        return all(typ == "B" for typ, _ in minors) and len({shade for _, shade in minors}) == 1
+
+    def game_result(self):
+        """
+        Returns how the game ended for the side to move, None while it goes on.
+        :return: str, CHECKMATE, STALEMATE, INSUFFICIENT_MATERIAL or None
+        """
+        if not self.has_legal_move():
+            return CHECKMATE if self.king_in_check(self.whites_turn) else STALEMATE
+        if self.insufficient_material():
+            return INSUFFICIENT_MATERIAL
+        return None
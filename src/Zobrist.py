@@ -0,0 +1,39 @@
+"""
+Random 64 bit keys for Zobrist hashing.
+
+A position key is the xor of one key per piece and tile, one per castling right still available, one for the
+file of the en passant tile and SIDE_KEY when black is to move. Moving a piece xors out its old key and xors in
+the new one, so the key can be kept up to date in O(1) per move.
+"""
+import random
+
+_random = random.Random(0x5EED)
+
+# Piece.index -> key of the piece on every square y * 8 + x
+PIECE_KEYS = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+CASTLING_KEYS = {right: _random.getrandbits(64) for right in "KQkq"}
+EP_KEYS = [_random.getrandbits(64) for _ in range(8)]
+SIDE_KEY = _random.getrandbits(64)
+
+
+def piece_key(piece, tile):
+    return PIECE_KEYS[piece.index][tile[1] * 8 + tile[0]]
+
+
+def board_key(board, castling, ep_tile):
+    """
+    Computes the key of a board from scratch, without the side to move.
+    :param board: 8x8 array of Piece and "-"
+    :param castling: str, rights like in FEN
+    :param ep_tile: tuple or None
+    :return: int
+    """
+    key = 0
+    for square, piece in enumerate(board.flat):
+        if piece != "-":
+            key ^= PIECE_KEYS[piece.index][square]
+    for right in castling:
+        key ^= CASTLING_KEYS[right]
+    if ep_tile is not None:
+        key ^= EP_KEYS[ep_tile[0]]
+    return key
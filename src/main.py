@@ -1,5 +1,14 @@
-from Game import Game
+import argparse
 
 if __name__ == "__main__":
-    game = Game()
+    # imported here so the engine worker processes, which re-import this module, don't load pygame
+    from Game import Game
+
+    parser = argparse.ArgumentParser(description="Chess clone with an AI opponent.")
+    parser.add_argument("--ai", choices=("w", "b"), help="color the engine plays, two human players if omitted")
+    parser.add_argument("--think-time", type=float, default=3.0, help="seconds the engine may think per move")
+    parser.add_argument("--fen", help="position to start from, the initial position if omitted")
+    parser.add_argument("--book", help="opening book for the engine, built with Book.py")
+    args = parser.parse_args()
+    game = Game(ai_color=args.ai, think_time=args.think_time, fen=args.fen, book=args.book)
     game.main_loop()
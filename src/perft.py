@@ -0,0 +1,177 @@
+"""
+Perft: counts the leaf nodes of the legal move tree to check and benchmark the move generators.
+
+Runs without pygame. From the src directory:
+    python perft.py --depth 4                        start position, with nodes per second
+    python perft.py --fen "<fen>" --depth 3 --divide node count per root move, next to the reference generator
+    python perft.py --suite                          standard positions against their published counts
+    python perft.py --suite --bitboard               the same for BitboardPosition
+"""
+import argparse
+import sys
+import time
+
+import Move
+from Bitboard import BitboardPosition
+from Position import Position, START_FEN
+
+# name, FEN and the published leaf counts for depth 1, 2, 3, ...
+STANDARD_POSITIONS = [
+    ("start", START_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def move_name(position, move):
+    tile, target, promotion = move
+    if target == "short_castle":
+        return Move.tile_name(tile) + Move.tile_name((tile[0] + 2, tile[1]))
+    if target == "long_castle":
+        return Move.tile_name(tile) + Move.tile_name((tile[0] - 2, tile[1]))
+    name = Move.tile_name(tile) + Move.tile_name(target)
+    if position.board[tile[1], tile[0]].typ == "P" and (target[1] == 0 or target[1] == 7):
+        name += promotion.lower()
+    return name
+
+
+def perft(position, depth):
+    """
+    Counts the leaf nodes of a Position to a given depth.
+    :param position: Position
+    :param depth: int
+    :return: int
+    """
+    if depth == 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make_move(*move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def perft_bitboard(position, depth):
+    """
+    Counts the leaf nodes of a BitboardPosition to a given depth.
+    :param position: BitboardPosition
+    :param depth: int
+    :return: int
+    """
+    if depth == 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        nodes += perft_bitboard(position.make_move(move), depth - 1)
+    return nodes
+
+
+def divide(position, depth):
+    """
+    Counts the leaf nodes below every root move of a Position.
+    :param position: Position
+    :param depth: int
+    :return: dict(str, int)
+    """
+    counts = {}
+    for move in position.legal_moves():
+        name = move_name(position, move)
+        position.make_move(*move)
+        counts[name] = perft(position, depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def divide_bitboard(position, depth):
+    """
+    Counts the leaf nodes below every root move of a BitboardPosition.
+    :param position: BitboardPosition
+    :param depth: int
+    :return: dict(str, int)
+    """
+    return {Move.name(move): perft_bitboard(position.make_move(move), depth - 1) for move in position.legal_moves()}
+
+
+def timed(count, position, depth):
+    start = time.perf_counter()
+    nodes = count(position, depth)
+    return nodes, time.perf_counter() - start
+
+
+def run_suite(max_depth, bitboard):
+    """
+    Runs every standard position up to max_depth and compares against the published counts.
+    :return: bool, whether all counts matched
+    """
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in STANDARD_POSITIONS:
+        for depth, reference in enumerate(expected[:max_depth], start=1):
+            if bitboard:
+                nodes, seconds = timed(perft_bitboard, BitboardPosition.from_position(Position.from_fen(fen)), depth)
+            else:
+                nodes, seconds = timed(perft, Position.from_fen(fen), depth)
+            total_nodes += nodes
+            total_time += seconds
+            status = "ok" if nodes == reference else "FAIL (expected {})".format(reference)
+            passed = passed and nodes == reference
+            print("{:<12} depth {}  {:>10} nodes  {:>8.2f} s  {}".format(name, depth, nodes, seconds, status))
+    print("{} nodes in {:.2f} s, {:.0f} nodes/s".format(total_nodes, total_time, total_nodes / max(total_time, 1e-9)))
+    return passed
+
+
+def print_divide(fen, depth):
+    """
+    Prints the node count per root move of the Position generator next to the one of the bitboard generator,
+    which serves as the reference, and marks every move where they differ.
+    :return: bool, whether both agreed on every move
+    """
+    counts = divide(Position.from_fen(fen), depth)
+    reference = divide_bitboard(BitboardPosition.from_position(Position.from_fen(fen)), depth)
+    agree = True
+    for name in sorted(set(counts) | set(reference)):
+        mark = ""
+        if counts.get(name) != reference.get(name):
+            mark = "  <-- reference {}".format(reference.get(name, "missing"))
+            agree = False
+        print("{}: {}{}".format(name, counts.get(name, "missing"), mark))
+    print("moves {}, nodes {}".format(len(counts), sum(counts.values())))
+    return agree
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Counts move generator leaf nodes to a given depth.")
+    parser.add_argument("--fen", default=START_FEN, help="position to count from, the start position by default")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--divide", action="store_true", help="node count per root move against the reference")
+    parser.add_argument("--suite", action="store_true", help="check the standard positions up to --depth")
+    parser.add_argument("--bitboard", action="store_true", help="use BitboardPosition instead of Position")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        return 0 if run_suite(args.depth, args.bitboard) else 1
+    if args.divide:
+        return 0 if print_divide(args.fen, args.depth) else 1
+    if args.bitboard:
+        nodes, seconds = timed(perft_bitboard, BitboardPosition.from_position(Position.from_fen(args.fen)), args.depth)
+    else:
+        nodes, seconds = timed(perft, Position.from_fen(args.fen), args.depth)
+    print("depth {}: {} nodes in {:.2f} s, {:.0f} nodes/s".format(args.depth, nodes, seconds,
+                                                                  nodes / max(seconds, 1e-9)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
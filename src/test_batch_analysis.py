@@ -0,0 +1,84 @@
+"""
+Regression checks that the vectorised BatchAnalysis functions agree with BitboardPosition and Position, run from
+the src directory with python -m pytest or python -m unittest.
+"""
+import unittest
+
+import numpy as np
+
+import Move
+from BatchAnalysis import attack_maps, encode_positions, evaluate_batch, in_check, move_counts
+from Bitboard import BitboardPosition
+from Evaluation import evaluate
+from perft import STANDARD_POSITIONS
+from Position import Position
+
+SPECIAL_FENS = [
+    # en passant that is legal, and one that would open the rank to the king
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "8/8/8/KPp4r/8/8/8/7k w - c6 0 1",
+    "8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1",
+    # a knight pinned on a diagonal, a bishop pinned on a file, a rook pinned along a rank
+    "4k3/8/8/b7/8/8/3N4/4K3 w - - 0 1",
+    "4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1",
+    "8/8/8/8/r2RK3/8/8/7k w - - 0 1",
+    # castling with a passed square attacked, with only the rook's path attacked, while in check, both sides
+    "r3k2r/8/8/8/8/8/5r2/R3K2R w KQkq - 0 1",
+    "r3k2r/8/8/8/8/8/1r6/R3K2R w KQkq - 0 1",
+    "r3k2r/8/8/8/8/8/4r3/R3K2R w KQkq - 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1",
+    # double check
+    "4k3/8/8/8/8/5n2/8/r3K3 w - - 0 1",
+    # promotions with and without a capture
+    "1r2k3/P7/8/8/8/8/7p/4K1N1 w - - 0 1",
+    "1r2k3/P7/8/8/8/8/7p/4K1N1 b - - 0 1",
+]
+
+
+def suite_positions():
+    """
+    Returns the perft suite positions, every position one move after them and the special cases.
+    """
+    positions = []
+    for _, fen, _ in STANDARD_POSITIONS:
+        position = Position.from_fen(fen)
+        positions.append(position)
+        for move in BitboardPosition.from_position(position).legal_moves():
+            child = Position.from_fen(fen)
+            child.make_move(*Move.to_tiles(move))
+            positions.append(Position.from_fen(child.to_fen()))
+    positions += [Position.from_fen(fen) for fen in SPECIAL_FENS]
+    return positions
+
+
+class BatchAnalysisTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.positions = suite_positions()
+        cls.boards, cls.whites_turn, cls.castling, cls.ep_squares = encode_positions(cls.positions)
+
+    def test_move_counts(self):
+        counts = move_counts(self.boards, self.whites_turn, self.castling, self.ep_squares)
+        for position, count in zip(self.positions, counts):
+            expected = len(BitboardPosition.from_position(position).legal_moves())
+            self.assertEqual(count, expected, position.to_fen())
+
+    def test_in_check(self):
+        checks = in_check(self.boards, self.whites_turn)
+        for position, check in zip(self.positions, checks):
+            self.assertEqual(check, BitboardPosition.from_position(position).in_check(), position.to_fen())
+
+    def test_attack_maps(self):
+        for by_white in (True, False):
+            maps = attack_maps(self.boards, by_white)
+            for position, attacks in zip(self.positions, maps):
+                expected = np.array([[position.is_attacked((x, y), by_white) for x in range(8)] for y in range(8)])
+                np.testing.assert_array_equal(attacks, expected, position.to_fen())
+
+    def test_evaluate_batch(self):
+        scores = evaluate_batch(self.boards, self.whites_turn)
+        self.assertEqual(list(scores), [evaluate(position) for position in self.positions])
+
+
+if __name__ == "__main__":
+    unittest.main()
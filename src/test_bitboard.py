@@ -0,0 +1,55 @@
+"""
+Regression checks for BitboardPosition, run from the src directory with python -m pytest or python -m unittest.
+"""
+import random
+import unittest
+
+import Move
+from Bitboard import BitboardPosition
+from Position import Position, START_FEN
+
+FENS = [
+    START_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+]
+
+
+def random_games(games, plies, seed):
+    """
+    Yields Position and BitboardPosition pairs of random games from the FENS, with the move that led there.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        position = Position.from_fen(rng.choice(FENS))
+        bitboards = BitboardPosition.from_position(position)
+        for _ in range(plies):
+            moves = bitboards.legal_moves()
+            if len(moves) == 0:
+                break
+            move = rng.choice(moves)
+            position.make_move(*Move.to_tiles(move))
+            bitboards = bitboards.make_move(move)
+            yield position, bitboards, move
+
+
+class BitboardPositionTest(unittest.TestCase):
+    def test_key_and_scores_follow_position(self):
+        for position, bitboards, move in random_games(40, 80, 1):
+            self.assertEqual(bitboards.zobrist_key(), position.zobrist_key(), Move.name(move))
+            self.assertEqual((bitboards.mg, bitboards.eg, bitboards.phase), (position.mg, position.eg, position.phase),
+                             Move.name(move))
+
+    def test_start_position(self):
+        self.assertEqual(BitboardPosition().zobrist_key(), Position.from_fen(START_FEN).zobrist_key())
+
+    def test_captures_only(self):
+        for _, bitboards, _ in random_games(40, 80, 2):
+            captures = [move for move in bitboards.legal_moves() if move >> 12 & Move.CAPTURE]
+            self.assertEqual(sorted(bitboards.legal_moves(captures_only=True)), sorted(captures))
+
+
+if __name__ == "__main__":
+    unittest.main()
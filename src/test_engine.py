@@ -0,0 +1,73 @@
+"""
+Regression checks for the engine's search and time management, run from the src directory with python -m pytest
+or python -m unittest.
+"""
+import unittest
+
+from Engine import Engine, MATE, clock_budget
+from Position import Position, START_FEN
+from tournament import play_game
+from uci import time_budget
+
+
+class ClockBudgetTest(unittest.TestCase):
+    def test_share_of_the_clock(self):
+        self.assertAlmostEqual(clock_budget(60.0, 0.0), 2.0)
+        self.assertAlmostEqual(clock_budget(60.0, 1.0), 2.5)
+
+    def test_increment_is_capped_by_the_clock(self):
+        budget = clock_budget(1.0, 2.0)
+        self.assertLess(budget, 1.0)
+        self.assertGreater(budget, 0.0)
+
+    def test_empty_clock(self):
+        self.assertEqual(clock_budget(0.0, 2.0), 0.0)
+
+    def test_uci_low_clock_high_increment(self):
+        budget, _ = time_budget("wtime 300 btime 300 winc 2000 binc 2000".split(), True)
+        self.assertLess(budget, 0.3)
+
+    def test_tournament_low_clock_high_increment(self):
+        game = play_game(1, START_FEN, ("Engine", "Engine"), ("A", "B"), ("clock", 1.0, 2.0), None, max_plies=2)
+        self.assertEqual(game["reason"], "move limit")
+
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+class SearchTest(unittest.TestCase):
+    def test_mate_in_one(self):
+        move, score, _ = Engine().search(Position.from_fen("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"), 10, 3)
+        self.assertEqual(move, ((3, 7), (3, 0), "Q"))
+        self.assertEqual(score, MATE - 1)
+
+    def test_mate_distance_stays_right_over_iterations(self):
+        engine = Engine()
+        for depth in range(4, 8):
+            _, score, _ = engine.search(Position.from_fen("7k/8/5K2/8/8/8/8/R7 w - - 0 1"), 10, depth)
+            self.assertEqual(score, MATE - 3)
+
+    def test_table_mate_scores_count_from_the_entry(self):
+        # mated 5 plies from the root at a node 3 plies deep, read back at a node 1 ply deep
+        stored = Engine._to_table(-MATE + 5, 3)
+        self.assertEqual(Engine._from_table(stored, 1), -MATE + 3)
+        self.assertEqual(Engine._from_table(Engine._to_table(42, 3), 1), 42)
+
+    def test_stalemate_without_moves(self):
+        move, score, _ = Engine().search(Position.from_fen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"), 1)
+        self.assertIsNone(move)
+        self.assertEqual(score, 0)
+
+    def test_short_budget_completes_the_first_iteration(self):
+        move, _, depth = Engine().search(Position.from_fen(KIWIPETE), 0.001)
+        self.assertGreaterEqual(depth, 1)
+        self.assertIn(move, Position.from_fen(KIWIPETE).legal_moves())
+
+    def test_search_leaves_the_position(self):
+        position = Position.from_fen(KIWIPETE)
+        Engine().search(position, max_depth=3)
+        self.assertEqual(position.to_fen(), KIWIPETE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Regression checks for restoring positions from the keyframes of History, run from the src directory with
+python -m pytest or python -m unittest.
+"""
+import random
+import unittest
+
+import Move
+from History import KEYFRAME_INTERVAL
+from Position import Position, START_FEN
+
+# black to move, castling rights on both sides and a halfmove clock that isn't 0
+KIWIPETE_BLACK = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b KQkq - 3 17"
+
+
+def play_game(fen, plies, seed):
+    """
+    Plays a random game that prefers castling, promotions and captures, and records the FEN after every ply.
+    :return: Position, list(str)
+    """
+    rng = random.Random(seed)
+    position = Position.from_fen(fen)
+    fens = [position.to_fen()]
+    for _ in range(plies):
+        moves = position.legal_moves()
+        if len(moves) == 0:
+            break
+        special = [move for move in moves if isinstance(move[1], str) or move[2] != "Q"
+                   or position.encode_move(*move) >> 12 & Move.CAPTURE]
+        move = rng.choice(special if special and rng.random() < 0.5 else moves)
+        position.move_piece(*move)
+        position.whites_turn = not position.whites_turn
+        fens.append(position.to_fen())
+    return position, fens
+
+
+class HistoryTest(unittest.TestCase):
+    def assertRestores(self, fen, plies, seed):
+        position, fens = play_game(fen, plies, seed)
+        history = position.history
+        self.assertGreater(len(history), 3 * KEYFRAME_INTERVAL)
+        for ply, expected in enumerate(fens):
+            self.assertEqual(history.position_at(ply).to_fen(), expected, "ply {}".format(ply))
+        position.go_to_ply(KEYFRAME_INTERVAL + 3)
+        self.assertEqual(position.to_fen(), fens[KEYFRAME_INTERVAL + 3])
+        position.go_to_ply(len(history))
+        self.assertEqual(position.to_fen(), fens[-1])
+        return [move >> 12 for move in history.moves]
+
+    def test_start_position(self):
+        self.assertRestores(START_FEN, 80, 3)
+
+    def test_black_to_move_with_castling_captures_and_promotions(self):
+        flags = self.assertRestores(KIWIPETE_BLACK, 120, 0)
+        self.assertTrue(any(flag & Move.CAPTURE for flag in flags))
+        self.assertTrue(any(flag & Move.PROMOTION for flag in flags))
+        self.assertTrue(any(flag in (Move.SHORT_CASTLE, Move.LONG_CASTLE) for flag in flags))
+
+
+if __name__ == "__main__":
+    unittest.main()
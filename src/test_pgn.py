@@ -0,0 +1,64 @@
+"""
+Regression checks for SAN parsing, run from the src directory with python -m pytest or python -m unittest.
+"""
+import unittest
+
+import Move
+from Bitboard import BitboardPosition
+from Pgn import san_to_move
+from Position import Position
+
+
+def play(fen, *sans):
+    position = BitboardPosition.from_position(Position.from_fen(fen))
+    for san in sans:
+        position = position.make_move(san_to_move(position, san))
+    return position
+
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class SanToMoveTest(unittest.TestCase):
+    def test_pawn_capture_onto_empty_square_is_illegal(self):
+        position = play(START, "e4", "d5")
+        with self.assertRaises(ValueError):
+            san_to_move(position, "exf5")
+
+    def test_pawn_capture(self):
+        position = play(START, "e4", "d5")
+        move = san_to_move(position, "exd5")
+        self.assertEqual(move >> 12, Move.CAPTURE)
+        self.assertEqual(Move.name(move), "e4d5")
+
+    def test_en_passant(self):
+        position = play(START, "e4", "a6", "e5", "d5")
+        move = san_to_move(position, "exd6")
+        self.assertEqual(move >> 12, Move.EN_PASSANT)
+        self.assertEqual(Move.name(move), "e5d6")
+
+    def test_en_passant_only_right_after_the_double_push(self):
+        position = play(START, "e4", "d5", "e5", "a6", "a3", "b6")
+        with self.assertRaises(ValueError):
+            san_to_move(position, "exd6")
+
+    def test_promotion(self):
+        position = play("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+        move = san_to_move(position, "a8=N")
+        self.assertEqual(Move.promotion(move), "N")
+        self.assertEqual(Move.name(move), "a7a8n")
+
+    def test_capture_promotion(self):
+        position = play("1r6/P6k/8/8/8/8/8/K7 w - - 0 1")
+        move = san_to_move(position, "axb8=Q+")
+        self.assertTrue(Move.is_capture(move))
+        self.assertEqual(Move.promotion(move), "Q")
+
+    def test_promotion_needs_a_piece(self):
+        position = play("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+        with self.assertRaises(ValueError):
+            san_to_move(position, "a8")
+
+
+if __name__ == "__main__":
+    unittest.main()
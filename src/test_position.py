@@ -0,0 +1,75 @@
+"""
+Regression checks for reading FEN strings, run from the src directory with python -m pytest or python -m unittest.
+"""
+import io
+import os
+import tempfile
+import unittest
+
+from Fen import load_positions
+from Position import Position, START_FEN
+from uci import UciEngine
+
+
+class FromFenTest(unittest.TestCase):
+    def assertInvalid(self, fen):
+        with self.assertRaises(ValueError):
+            Position.from_fen(fen)
+
+    def test_start_position_round_trip(self):
+        self.assertEqual(Position.from_fen(START_FEN).to_fen(), START_FEN)
+
+    def test_empty(self):
+        self.assertInvalid("")
+
+    def test_placement(self):
+        self.assertInvalid("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1")
+        self.assertInvalid("rnbqkbnr/ppppppppp/7/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        self.assertInvalid("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1")
+
+    def test_kings(self):
+        self.assertInvalid("8/8/8/8/8/8/8/8 w - - 0 1")
+        self.assertInvalid("4k3/8/8/8/8/8/8/8 w - - 0 1")
+        self.assertInvalid("4k3/8/8/8/8/8/8/3KK3 w - - 0 1")
+
+    def test_pawns_on_the_back_ranks(self):
+        self.assertInvalid("4k3/8/8/8/8/8/8/p3K3 b - - 0 1")
+        self.assertInvalid("P3k3/8/8/8/8/8/8/4K3 w - - 0 1")
+
+    def test_side_to_move(self):
+        self.assertInvalid("4k3/8/8/8/8/8/8/4K3 x - - 0 1")
+
+    def test_castling_rights(self):
+        self.assertInvalid("r3k2r/8/8/8/8/8/8/R3K2R w KQkx - 0 1")
+        self.assertInvalid("r3k2r/8/8/8/8/8/8/R3K2R w KKq - 0 1")
+
+    def test_en_passant_square(self):
+        self.assertInvalid("4k3/8/8/8/4P3/8/8/4K3 b - e4 0 1")
+        self.assertInvalid("4k3/8/8/8/4P3/8/8/4K3 b - i3 0 1")
+
+    def test_clocks(self):
+        self.assertInvalid("4k3/8/8/8/8/8/8/4K3 w - - x 1")
+        position = Position.from_fen("4k3/8/8/8/8/8/8/4K3 w - - 12")
+        self.assertEqual(position.halfmove_clock, 12)
+        self.assertEqual(position.fullmove_number, 1)
+
+    def test_load_positions_names_the_line(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".fen", delete=False) as file:
+            file.write(START_FEN + "\n4k3/8/8/8/8/8/8/p3K3 b - - 0 1\n")
+        try:
+            with self.assertRaisesRegex(ValueError, ":2: "):
+                list(load_positions(file.name))
+        finally:
+            os.remove(file.name)
+
+    def test_uci_ignores_a_position_without_kings(self):
+        output = io.StringIO()
+        engine = UciEngine(output)
+        engine.run(["position fen 8/8/8/8/8/8/8/8 w - - 0 1", "go depth 1"])
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("info string ignored"))
+        self.assertTrue(lines[-1].startswith("bestmove "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Regression checks for the match statistics of tournament.py, run from the src directory with python -m pytest or
+python -m unittest.
+"""
+import math
+import unittest
+
+from tournament import Tournament, elo, elo_interval
+
+
+class EloTest(unittest.TestCase):
+    def test_even_score(self):
+        self.assertEqual(elo(0.5), 0)
+        difference, margin = elo_interval(10, 20, 10)
+        self.assertAlmostEqual(difference, 0)
+        self.assertGreater(margin, 0)
+
+    def test_clean_sweep_is_finite(self):
+        for wins, losses in ((20, 0), (0, 20)):
+            difference, margin = elo_interval(wins, 0, losses)
+            self.assertTrue(math.isfinite(difference))
+            self.assertTrue(math.isfinite(margin))
+            self.assertGreater(margin, 0)
+        self.assertGreater(elo_interval(20, 0, 0)[0], 0)
+        self.assertLess(elo_interval(0, 0, 20)[0], 0)
+
+    def test_no_games(self):
+        self.assertEqual(elo_interval(0, 0, 0), (0.0, math.inf))
+
+    def test_report_without_games(self):
+        tournament = Tournament(("Engine", "Engine"), [], 0, ("movetime", 0.1))
+        self.assertIn("0 games", tournament.report())
+
+    def test_report_of_a_clean_sweep(self):
+        tournament = Tournament(("Engine", "Engine"), [], 2, ("movetime", 0.1))
+        for round_number in (1, 2):
+            tournament.add({"round": round_number, "result": "1-0" if round_number == 1 else "0-1",
+                            "reason": "checkmate", "worker": 1, "nodes": 100, "seconds": 1.0})
+        self.assertNotIn("inf", tournament.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
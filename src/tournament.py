@@ -0,0 +1,294 @@
+"""
+Headless engine against engine matches, to measure strength and speed changes without clicking through games.
+
+Games are played in a pool of processes, each pair of games starts from the same opening with the colors
+swapped. Results go to a CSV file and the games to a PGN file as soon as each game ends. The engines are
+modules that define an Engine class like Engine.py, so a changed engine can play a saved copy of the old one.
+Runs without pygame. From the src directory:
+    python tournament.py --games 200 --tc 10+0.1               Engine against itself, 10 s plus 0.1 s per move
+    python tournament.py --engines Engine EngineOld --movetime 0.2 --openings openings.fen --pgn games.pgn
+
+Since the engines search deterministically, thousands of games need as many different openings, e.g. a FEN
+file given with --openings.
+"""
+import argparse
+import csv
+import importlib
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Engine import clock_budget
+from Fen import read_fens
+from Pgn import PgnGame, game_to_pgn
+from Position import Position, CHECKMATE
+
+# a few short openings in SAN, used when no opening file is given
+OPENINGS = [
+    "e4 e5 Nf3 Nc6", "e4 c5 Nf3 d6", "e4 e6 d4 d5", "e4 c6 d4 d5", "d4 d5 c4 e6", "d4 Nf6 c4 g6",
+    "c4 e5 Nc3 Nf6", "Nf3 d5 g3 Nf6",
+]
+# plies after which a game is adjudicated as a draw
+MAX_PLIES = 400
+
+
+def default_openings():
+    return [PgnGame(moves=line.split()).to_position().to_fen() for line in OPENINGS]
+
+
+def load_engine(module, max_depth):
+    """
+    Creates the Engine of a module.
+    :param module: str, e.g. "Engine"
+    :param max_depth: int or None
+    :return: Engine
+    """
+    engine_class = importlib.import_module(module).Engine
+    return engine_class() if max_depth is None else engine_class(max_depth=max_depth)
+
+
+def play_game(round_number, fen, modules, names, time_control, max_depth, max_plies=MAX_PLIES):
+    """
+    Plays one game between two engines, runs in a worker process.
+    :param round_number: int
+    :param fen: str, position the game starts from
+    :param modules: tuple of str, modules of the white and the black engine
+    :param names: tuple of str, player names for the PGN
+    :param time_control: tuple, ("movetime", seconds) or ("clock", base seconds, increment seconds)
+    :param max_depth: int or None
+    :param max_plies: int
+    :return: dict with round, result, reason, plies, nodes, seconds of thinking, worker and the PGN
+    """
+    position = Position.from_fen(fen)
+    engines = [load_engine(module, max_depth) for module in modules]
+    clocks = [time_control[1], time_control[1]] if time_control[0] == "clock" else None
+    # zobrist key -> how often the position occurred, for threefold repetition
+    seen = {position.zobrist_key(): 1}
+    nodes = 0
+    thinking = 0.0
+    plies = 0
+    while True:
+        result, reason = adjudicate(position, seen, plies, max_plies)
+        if result is not None:
+            break
+        side = 0 if position.whites_turn else 1
+        if clocks is None:
+            budget = time_control[1]
+        else:
+            budget = clock_budget(clocks[side], time_control[2])
+        start = time.perf_counter()
+        move = engines[side].search(position, time_budget=budget)[0]
+        elapsed = time.perf_counter() - start
+        nodes += engines[side].nodes
+        thinking += elapsed
+        if clocks is not None:
+            clocks[side] -= elapsed
+            if clocks[side] < 0:
+                result, reason = ("0-1" if side == 0 else "1-0"), "time forfeit"
+                break
+            clocks[side] += time_control[2]
+        position.move_piece(*move)
+        position.whites_turn = not position.whites_turn
+        plies += 1
+        key = position.zobrist_key()
+        seen[key] = seen.get(key, 0) + 1
+
+    headers = {"Event": "ChessClone tournament", "Date": time.strftime("%Y.%m.%d"), "Round": str(round_number),
+               "White": names[0], "Black": names[1], "Termination": reason}
+    return {"round": round_number, "result": result, "reason": reason, "plies": plies, "nodes": nodes,
+            "seconds": thinking, "worker": os.getpid(), "pgn": game_to_pgn(position, headers, result)}
+
+
+def adjudicate(position, seen, plies, max_plies):
+    """
+    Decides whether a game is over.
+    :return: result: str, "1-0", "0-1", "1/2-1/2" or None while the game goes on, reason: str
+    """
+    outcome = position.game_result()
+    if outcome == CHECKMATE:
+        return ("0-1" if position.whites_turn else "1-0"), outcome
+    if outcome is not None:
+        return "1/2-1/2", outcome
+    if position.halfmove_clock >= 100:
+        return "1/2-1/2", "fifty moves"
+    if seen[position.zobrist_key()] >= 3:
+        return "1/2-1/2", "threefold repetition"
+    if plies >= max_plies:
+        return "1/2-1/2", "move limit"
+    return None, None
+
+
+def elo(score):
+    """
+    Returns the Elo difference that makes a score expected.
+    :param score: float, between 0 and 1
+    :return: float
+    """
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_interval(wins, draws, losses):
+    """
+    Returns the Elo difference of a match result and the half width of its 95% confidence interval.
+    :param wins: int
+    :param draws: int
+    :param losses: int
+    :return: difference: float, margin: float, 0 and infinity without games
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    # a clean sweep has no finite Elo difference, it counts as half a game less than that
+    score = min(max((wins + draws / 2) / games, 0.5 / games), 1 - 0.5 / games)
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    deviation = 1.96 * math.sqrt(variance / games)
+    low, high = elo(max(score - deviation, 1e-9)), elo(min(score + deviation, 1 - 1e-9))
+    return elo(score), (high - low) / 2
+
+
+class Tournament:
+    """
+    Plays a match between two engine modules and keeps its statistics, from the view of the first engine.
+    """
+
+    def __init__(self, modules, openings, games, time_control, max_depth=None, workers=None):
+        self.modules = modules
+        # the same module twice still needs two player names
+        self.names = tuple("{} {}".format(module, letter) for module, letter in zip(modules, "AB"))
+        self.openings = openings
+        self.games = games
+        self.time_control = time_control
+        self.max_depth = max_depth
+        self.workers = workers or os.cpu_count() or 1
+        self.wins = self.draws = self.losses = 0
+        self.reasons = {}
+        # worker pid -> games, nodes, seconds of thinking
+        self.worker_stats = {}
+        self.started = 0.0
+
+    def schedule(self):
+        """
+        Yields the arguments of play_game for every game, the first engine takes white in odd rounds.
+        """
+        for index in range(self.games):
+            fen = self.openings[index // 2 % len(self.openings)]
+            order = (0, 1) if index % 2 == 0 else (1, 0)
+            yield (index + 1, fen, tuple(self.modules[i] for i in order), tuple(self.names[i] for i in order),
+                   self.time_control, self.max_depth)
+
+    def run(self, results_path=None, pgn_path=None, report_every=10):
+        """
+        Plays all games and writes every finished one out right away.
+        :param results_path: str, CSV file, not written if None
+        :param pgn_path: str, PGN file the games are appended to, not written if None
+        :param report_every: int, print the standings after this many games
+        """
+        self.started = time.perf_counter()
+        results_file = open(results_path, "w", newline="") if results_path else None
+        pgn_file = open(pgn_path, "a", encoding="utf-8") if pgn_path else None
+        writer = None
+        if results_file is not None:
+            writer = csv.writer(results_file)
+            writer.writerow(("round", "white", "black", "result", "reason", "plies", "nodes", "seconds"))
+        # spawn, like the other process pools, so workers start the same on every platform
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                futures = [executor.submit(play_game, *arguments) for arguments in self.schedule()]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    game = future.result()
+                    self.add(game)
+                    if writer is not None:
+                        white_first = game["round"] % 2 == 1
+                        writer.writerow((game["round"], self.names[0 if white_first else 1],
+                                         self.names[1 if white_first else 0], game["result"], game["reason"],
+                                         game["plies"], game["nodes"], "{:.2f}".format(game["seconds"])))
+                        results_file.flush()
+                    if pgn_file is not None:
+                        pgn_file.write(game["pgn"] + "\n")
+                        pgn_file.flush()
+                    if done % report_every == 0 and done < self.games:
+                        print(self.standings())
+        finally:
+            if results_file is not None:
+                results_file.close()
+            if pgn_file is not None:
+                pgn_file.close()
+
+    def add(self, game):
+        # odd rounds have the first engine playing white
+        first_white = game["round"] % 2 == 1
+        if game["result"] == "1/2-1/2":
+            self.draws += 1
+        elif (game["result"] == "1-0") == first_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.reasons[game["reason"]] = self.reasons.get(game["reason"], 0) + 1
+        games, nodes, seconds = self.worker_stats.get(game["worker"], (0, 0, 0.0))
+        self.worker_stats[game["worker"]] = (games + 1, nodes + game["nodes"], seconds + game["seconds"])
+
+    def standings(self):
+        played = self.wins + self.draws + self.losses
+        if played == 0:
+            return "0 games, {} vs {}".format(self.names[0], self.names[1])
+        difference, margin = elo_interval(self.wins, self.draws, self.losses)
+        minutes = (time.perf_counter() - self.started) / 60
+        return "{} games, {} vs {}: +{} ={} -{}, elo {:+.1f} +- {:.1f}, {:.1f} games/min".format(
+            played, self.names[0], self.names[1], self.wins, self.draws, self.losses, difference, margin,
+            played / max(minutes, 1e-9))
+
+    def report(self):
+        """
+        Returns the final standings with the ways games ended and the speed of every worker.
+        :return: str
+        """
+        lines = [self.standings()]
+        if self.reasons:
+            lines.append(", ".join("{} {}".format(reason, count) for reason, count in sorted(self.reasons.items())))
+        for worker, (games, nodes, seconds) in sorted(self.worker_stats.items()):
+            lines.append("worker {}: {} games, {:.0f} nodes/s".format(worker, games, nodes / max(seconds, 1e-9)))
+        return "\n".join(lines)
+
+
+def parse_time_control(text):
+    """
+    Reads a time control like "10+0.1", base seconds plus increment per move.
+    :param text: str
+    :return: tuple, ("clock", base, increment)
+    """
+    base, _, increment = text.partition("+")
+    return "clock", float(base), float(increment or 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays engine against engine matches in a process pool.")
+    parser.add_argument("--engines", nargs=2, default=["Engine", "Engine"], metavar="MODULE",
+                        help="modules defining the Engine classes to match, Engine against itself by default")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--tc", default="10+0.1", help="seconds per game plus seconds added per move")
+    parser.add_argument("--movetime", type=float, help="fixed seconds per move instead of a game clock")
+    parser.add_argument("--depth", type=int, help="maximum search depth")
+    parser.add_argument("--openings", help="FEN file of start positions, built in openings if omitted")
+    parser.add_argument("--workers", type=int, help="processes, one per CPU core by default")
+    parser.add_argument("--results", help="CSV file for the result of every game")
+    parser.add_argument("--pgn", help="PGN file the games are appended to")
+    args = parser.parse_args(argv)
+
+    openings = [fen for _, fen in read_fens(args.openings)] if args.openings else default_openings()
+    time_control = ("movetime", args.movetime) if args.movetime else parse_time_control(args.tc)
+    tournament = Tournament(tuple(args.engines), openings, args.games, time_control, args.depth, args.workers)
+    tournament.run(args.results, args.pgn)
+    print(tournament.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+UCI protocol over stdin and stdout, so the engine can play under tournament managers and in scripted matches.
+
+Never imports pygame. The rules, and numpy with them, are only loaded on the first command that needs a
+position, so "uci" is answered right after start and the loading time falls into "isready". From the src
+directory:
+    python uci.py
+
+Understood commands: uci, isready, ucinewgame, position startpos|fen <fen> [moves <move> ...],
+go [movetime <ms>] [depth <n>] [wtime <ms> btime <ms> winc <ms> binc <ms>] [infinite], stop, quit and
+setoption name Book value <path> for an opening book built with Book.py and setoption name Threads value <n>,
+which searches with ParallelSearch in n processes for n > 1. Commands that can't be read, like
+illegal moves, are ignored and answered with an info string.
+"""
+import sys
+import threading
+
+import Move
+from Engine import Engine, MATE, clock_budget
+
+NAME = "ChessClone"
+# upper limit of the Threads option, more processes than cores are allowed but only slow the search down
+MAX_THREADS = 64
+
+
+def parse_move(position, text):
+    """
+    Turns a move in UCI coordinate notation like "e2e4", "e1g1" or "e7e8q" into the tile, target and promotion
+    Position.make_move takes.
+    :param position: Position
+    :param text: str
+    :return: tuple
+    :raises ValueError: if the text is no legal move of the position
+    """
+    if len(text) not in (4, 5) or text[0] not in "abcdefgh" or text[2] not in "abcdefgh" \
+            or text[1] not in "12345678" or text[3] not in "12345678" or text[4:] not in ("", "q", "r", "b", "n"):
+        raise ValueError("invalid move: " + text)
+    tile = ("abcdefgh".index(text[0]), 8 - int(text[1]))
+    target = ("abcdefgh".index(text[2]), 8 - int(text[3]))
+    promotion = text[4].upper() if len(text) > 4 else "Q"
+    piece = position.board[tile[1], tile[0]]
+    # castling is sent as the king moving two tiles
+    if piece != "-" and piece.typ == "K" and abs(target[0] - tile[0]) == 2:
+        target = "short_castle" if target[0] > tile[0] else "long_castle"
+    if (tile, target, promotion) not in position.legal_moves():
+        raise ValueError("illegal move: " + text)
+    return tile, target, promotion
+
+
+def move_text(position, move):
+    """
+    Returns a move of the position in UCI coordinate notation.
+    :param position: Position
+    :param move: tuple of tile, target and promotion
+    :return: str
+    """
+    return Move.name(position.encode_move(*move))
+
+
+def score_text(score):
+    """
+    Returns a search score as UCI reports it, centipawns or moves to mate.
+    :param score: int, from the view of the side to move
+    :return: str
+    """
+    if abs(score) > MATE - 1000:
+        plies = MATE - abs(score)
+        return "mate {}".format((plies + 1) // 2 if score > 0 else -(plies // 2))
+    return "cp {}".format(score)
+
+
+def set_position(tokens):
+    """
+    Builds the position of a "position" command.
+    :param tokens: list(str), the words after "position"
+    :return: Position
+    :raises ValueError: for an invalid FEN or move
+    """
+    # imported here, numpy takes most of the start up time
+    from Position import Position, START_FEN
+
+    if "moves" in tokens:
+        index = tokens.index("moves")
+        setup, moves = tokens[:index], tokens[index + 1:]
+    else:
+        setup, moves = tokens, []
+    if setup[:1] == ["fen"] and len(setup) > 1:
+        position = Position.from_fen(" ".join(setup[1:]))
+    elif setup == ["startpos"]:
+        position = Position.from_fen(START_FEN)
+    else:
+        raise ValueError("expected startpos or fen: " + " ".join(tokens))
+    for text in moves:
+        position.make_move(*parse_move(position, text))
+    # the search only needs the current position, not a way back to the start
+    position.undo_stack = []
+    return position
+
+
+def time_budget(tokens, whites_turn):
+    """
+    Reads the limits of a "go" command.
+    :param tokens: list(str), the words after "go"
+    :param whites_turn: bool
+    :return: budget: float, seconds, None for the engine's default, max_depth: int or None
+    :raises ValueError: for a limit that is no number
+    """
+    values = {}
+    for name, value in zip(tokens, tokens[1:]):
+        if name in ("movetime", "depth", "wtime", "btime", "winc", "binc"):
+            try:
+                values[name] = int(value)
+            except ValueError:
+                raise ValueError("invalid {}: {}".format(name, value))
+    budget = float("inf")
+    if "movetime" in values:
+        budget = values["movetime"] / 1000
+    elif ("wtime" if whites_turn else "btime") in values:
+        remaining = values["wtime" if whites_turn else "btime"]
+        increment = values.get("winc" if whites_turn else "binc", 0)
+        budget = clock_budget(remaining / 1000, increment / 1000)
+    elif "depth" not in values and "infinite" not in tokens:
+        budget = None
+    return budget, values.get("depth")
+
+
+class UciEngine:
+    """
+    Reads UCI commands and answers them. Searches run in a background thread so stop and isready are handled
+    while the engine thinks, the thread prints bestmove when it is done.
+    """
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.engine = Engine()
+        # ParallelSearch with Threads > 1, searches then go to it instead of the engine
+        self.parallel = None
+        self.position = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.engine.stop_check = self.stop_event.is_set
+        self.lock = threading.Lock()
+
+    def send(self, line):
+        with self.lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line):
+        """
+        Handles one command line. A command that can't be read is ignored and reported as info string.
+        :param line: str
+        :return: bool, False after quit
+        """
+        try:
+            return self._handle(line.split())
+        except (ValueError, OSError) as error:
+            # OSError for a book file that can't be opened
+            self.send("info string ignored {!r}: {}".format(line.strip(), error))
+            return True
+
+    def _handle(self, tokens):
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send("id name " + NAME)
+            self.send("id author ldressen")
+            self.send("option name Book type string default <empty>")
+            self.send("option name Threads type spin default 1 min 1 max {}".format(MAX_THREADS))
+            self.send("uciok")
+        elif command == "isready":
+            if self.position is None:
+                self.position = set_position(["startpos"])
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.engine.table.clear()
+        elif command == "position" and arguments:
+            self.stop()
+            self.position = set_position(arguments)
+        elif command == "go":
+            self.stop()
+            self.go(arguments)
+        elif command == "setoption":
+            self.stop()
+            self.set_option(arguments)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            self.close()
+            return False
+        return True
+
+    def set_option(self, arguments):
+        if "name" not in arguments or "value" not in arguments:
+            return
+        name = " ".join(arguments[arguments.index("name") + 1:arguments.index("value")])
+        value = " ".join(arguments[arguments.index("value") + 1:])
+        if name.lower() == "book":
+            # imported here like Position, the book module loads the rules
+            from Book import Book
+
+            if self.engine.book is not None:
+                self.engine.book.close()
+            self.engine.book = Book(value) if value and value != "<empty>" else None
+            if self.parallel is not None:
+                self.parallel.book = self.engine.book
+        elif name.lower() == "threads":
+            try:
+                threads = min(max(int(value), 1), MAX_THREADS)
+            except ValueError:
+                raise ValueError("invalid Threads: " + value)
+            self.close()
+            if threads > 1:
+                # imported here like Book, it loads the rules
+                from ParallelSearch import ParallelSearch
+
+                self.parallel = ParallelSearch(threads, book=self.engine.book)
+
+    def go(self, arguments):
+        if self.position is None:
+            self.position = set_position(["startpos"])
+        budget, max_depth = time_budget(arguments, self.position.whites_turn)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._search, args=(self.position, budget, max_depth), daemon=True)
+        self.thread.start()
+
+    def _search(self, position, budget, max_depth):
+        searcher = self.engine if self.parallel is None else self.parallel
+        move, score, depth = searcher.search(position, time_budget=budget, max_depth=max_depth)
+        self.send("info depth {} score {} nodes {}".format(depth, score_text(score), searcher.nodes))
+        self.send("bestmove " + (move_text(position, move) if move is not None else "0000"))
+
+    def stop(self):
+        """
+        Stops a running search, which still answers with the best move it found.
+        """
+        if self.thread is not None:
+            self.stop_event.set()
+            if self.parallel is not None:
+                self.parallel.stop()
+            self.thread.join()
+            self.thread = None
+
+    def close(self):
+        """
+        Shuts the worker processes of a parallel search down, searches go back to the engine.
+        """
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
+    def run(self, lines):
+        for line in lines:
+            if not self.handle(line):
+                return
+        # input ran out, a scripted "go" still gets its answer
+        if self.thread is not None:
+            self.thread.join()
+        self.close()
+
+
+def main():
+    UciEngine().run(sys.stdin)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())